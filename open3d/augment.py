@@ -0,0 +1,184 @@
+import os
+import shutil
+import multiprocessing as mp
+import cv2
+import numpy as np
+from functools import partial
+from PIL import Image
+import telemetry
+from image_io import LETTERBOX_FILL, RENDER_BACKGROUND, image_format, letterbox_bars, list_images, write_image
+
+_BACKGROUNDS = []
+
+def foreground_masks(images, background=RENDER_BACKGROUND, tolerance=12, letterbox_fill=LETTERBOX_FILL):
+    """(N, H, W) float alpha of an (N, H, W, 3) batch: 1 wherever a pixel differs from the flat background.
+
+    background is RGB. Letterbox padding bars of letterbox_fill count as
+    background too (None turns that off). Edges are feathered by a 3x3 box
+    so the composite has no hard seam; object parts of the background
+    colour key out as well.
+    """
+    masks = (np.abs(images.astype(np.int16) - np.array(background[::-1], dtype=np.int16)).max(axis=3) > tolerance)
+    if letterbox_fill is not None:
+        masks &= ~letterbox_bars(images, letterbox_fill)
+    return box_blur(masks.astype(np.float32)[..., None], 3)[..., 0]
+
+def box_blur(images, k):
+    """k x k box blur of an (N, H, W, C) float batch at once, with edge padding (k odd)."""
+    if k <= 1:
+        return images
+    pad = k // 2
+    padded = np.pad(images, ((0, 0), (pad, pad), (pad, pad), (0, 0)), mode='edge')
+    # Running sums along each axis turn the box sum into two subtractions
+    summed = np.cumsum(padded, axis=1, dtype=np.float32)
+    summed = np.concatenate([summed[:, k - 1:k], summed[:, k:] - summed[:, :-k]], axis=1)
+    summed = np.cumsum(summed, axis=2, dtype=np.float32)
+    summed = np.concatenate([summed[:, :, k - 1:k], summed[:, :, k:] - summed[:, :, :-k]], axis=2)
+    return summed / (k * k)
+
+def fit_background(background, width, height, rng):
+    """Random width x height crop of a background scaled just enough to cover it."""
+    bg_height, bg_width = background.shape[:2]
+    scale = max(width / bg_width, height / bg_height)
+    resized = cv2.resize(background, (max(round(bg_width * scale), width), max(round(bg_height * scale), height)),
+                         interpolation=cv2.INTER_AREA if scale < 1 else cv2.INTER_LINEAR)
+    top = rng.integers(0, resized.shape[0] - height + 1)
+    left = rng.integers(0, resized.shape[1] - width + 1)
+    return resized[top:top + height, left:left + width]
+
+def composite(images, alphas, backgrounds):
+    """Alpha-blend a batch of renders over a batch of same-sized backgrounds, as float32."""
+    alphas = alphas[..., None]
+    return images.astype(np.float32) * alphas + backgrounds.astype(np.float32) * (1 - alphas)
+
+def photometric(images, rng, brightness=0.25, contrast=0.3, noise=8.0, blur_prob=0.3, max_blur=5):
+    """Random brightness, contrast, Gaussian noise and box blur over a float (N, H, W, 3) batch.
+
+    Every image draws its own factors; the arithmetic runs over the whole
+    batch at once, and the blur over each group of images sharing a kernel
+    size. brightness and contrast are maximum relative changes, noise the
+    maximum per-image noise sigma in grey levels. Returns uint8.
+    """
+    n = len(images)
+    gain = 1 + rng.uniform(-contrast, contrast, (n, 1, 1, 1)).astype(np.float32)
+    offset = rng.uniform(-brightness, brightness, (n, 1, 1, 1)).astype(np.float32) * 255
+    means = images.mean(axis=(1, 2, 3), keepdims=True)
+    images = (images - means) * gain + means + offset
+    sigmas = rng.uniform(0, noise, (n, 1, 1, 1)).astype(np.float32)
+    images += rng.standard_normal(images.shape, dtype=np.float32) * sigmas
+
+    kernels = np.where(rng.random(n) < blur_prob, rng.choice(np.arange(3, max_blur + 1, 2), n), 1)
+    for k in np.unique(kernels[kernels > 1]):
+        images[kernels == k] = box_blur(images[kernels == k], k)
+    return np.clip(images, 0, 255).round().astype(np.uint8)
+
+def _load_backgrounds(background_dir):
+    # Runs once per worker, so every batch draws from an in-memory pool
+    _BACKGROUNDS[:] = [cv2.imread(f) for f in list_images(background_dir)] if background_dir else []
+    _BACKGROUNDS[:] = [b for b in _BACKGROUNDS if b is not None]
+
+def augment_batch(options, task):
+    """Worker entry point: write options['variants'] augmented copies of a batch of same-sized images.
+
+    The batch is seeded by its index, so the output does not depend on the
+    number of workers. Labels of every label dir are copied alongside,
+    unchanged, since neither compositing nor the photometric changes move
+    the objects. Returns the number of images written.
+    """
+    batch_index, image_files = task
+    rng = np.random.default_rng([options['seed'], batch_index])
+    images = np.stack([cv2.imread(f) for f in image_files])
+    height, width = images.shape[1:3]
+    alphas = foreground_masks(images, options['background'], options['tolerance'])
+
+    written = 0
+    for variant in range(options['variants']):
+        with telemetry.timer('augment'):
+            if _BACKGROUNDS:
+                backgrounds = np.stack([fit_background(_BACKGROUNDS[rng.integers(len(_BACKGROUNDS))], width, height,
+                                                       rng) for _ in image_files])
+                keep = rng.random(len(image_files)) < options['keep_background']
+                backgrounds[keep] = images[keep]
+                batch = composite(images, alphas, backgrounds)
+            else:
+                batch = images.astype(np.float32)
+            batch = photometric(batch, rng, **options['photometric'])
+
+        for image_file, image in zip(image_files, batch):
+            name = f"{os.path.splitext(os.path.basename(image_file))[0]}_aug{variant}"
+            write_image(os.path.join(options['output_dir'], name + options['output_format'].extension), image,
+                        options['output_format'])
+            for label_dir, out_label_dir in options['label_dirs']:
+                label_file = os.path.join(label_dir, os.path.splitext(os.path.basename(image_file))[0] + '.txt')
+                if os.path.exists(label_file):
+                    shutil.copyfile(label_file, os.path.join(out_label_dir, name + '.txt'))
+            written += 1
+    telemetry.count('images_augmented', written)
+    return written
+
+def make_batches(image_files, batch_size, max_batch_pixels):
+    """(index, files) batches of images of the same size, so they stack into one array.
+
+    A batch holds at most batch_size images and max_batch_pixels pixels, as
+    the float working copies take about 100 bytes per pixel.
+    """
+    by_size = {}
+    for image_file in image_files:
+        # Pillow reads the size from the header without decoding the pixels
+        try:
+            with Image.open(image_file) as image:
+                width, height = image.size
+        except OSError:
+            print(f"Could not read {image_file}")
+            continue
+        by_size.setdefault((height, width), []).append(image_file)
+    batches = []
+    for (height, width), files in by_size.items():
+        size = max(1, min(batch_size, max_batch_pixels // (height * width)))
+        batches.extend(files[start:start + size] for start in range(0, len(files), size))
+    return list(enumerate(batches))
+
+def augment_dataset(image_dir, label_dirs, output_dir, background_dir=None, variants=2, keep_background=0.1,
+                    background=RENDER_BACKGROUND, tolerance=12, photometric_options=None, output_format=None,
+                    batch_size=32, max_batch_pixels=8_000_000, num_workers=4, seed=0):
+    """Write variants augmented copies of every render in image_dir to output_dir.
+
+    Each copy has the render's flat background replaced by a random crop of
+    an image from background_dir (a fraction keep_background keeps the
+    original) and random brightness/contrast/noise/blur applied (see
+    photometric for photometric_options). Labels in label_dirs are carried
+    over to an output_dir subdirectory named like each label dir.
+    Batches of at most batch_size images and max_batch_pixels pixels (about
+    800 MB of working memory at the default) are processed over num_workers
+    processes.
+    """
+    output_format = output_format or image_format('png')
+    image_out = os.path.join(output_dir, 'images')
+    label_pairs = [(d, os.path.join(output_dir, os.path.basename(os.path.normpath(d)))) for d in label_dirs]
+    for directory in [image_out] + [out for _, out in label_pairs]:
+        os.makedirs(directory, exist_ok=True)
+
+    options = {'output_dir': image_out, 'label_dirs': label_pairs, 'variants': variants,
+               'keep_background': keep_background, 'background': background, 'tolerance': tolerance,
+               'photometric': photometric_options or {}, 'output_format': output_format, 'seed': seed}
+    batches = make_batches(list_images(image_dir), batch_size, max_batch_pixels)
+    total = sum(len(files) for _, files in batches) * variants
+    done = 0
+    with mp.get_context('spawn').Pool(min(num_workers, os.cpu_count()), initializer=_load_backgrounds,
+                                      initargs=(background_dir,)) as pool:
+        task = telemetry.collect(partial(augment_batch, options))
+        for written in map(telemetry.merged, pool.imap_unordered(task, batches)):
+            done += written
+            print(f"{done}/{total} augmented images saved...")
+    print(f"All {total} augmented images saved in {image_out}.")
+    return done
+
+if __name__ == "__main__":
+    # Parameters
+    image_directory = 'train/images'
+    label_directories = ['train/labels', 'train/labels_seg']  # Missing directories are skipped
+    background_directory = 'backgrounds'  # Shelf / store photos; None keeps the render background
+    variants = 2  # Augmented copies per render
+
+    augment_dataset(image_directory, [d for d in label_directories if os.path.isdir(d)], 'train_augmented',
+                    background_directory, variants)
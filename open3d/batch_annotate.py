@@ -0,0 +1,126 @@
+import cv2
+import os
+import time
+import multiprocessing as mp
+import telemetry
+from functools import partial
+from image_io import AsyncImageWriter
+from yolo_labels import get_class_id, class_name_from_filename, yolo_bbox_line
+
+def canny_boxes(image):
+    """Bounding boxes (x, y, w, h) of the external Canny edge contours of a BGR image."""
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+
+    # Edge detection
+    edges = cv2.Canny(gray, 50, 150)
+
+    # Find contours
+    contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    return [cv2.boundingRect(contour) for contour in contours]
+
+def label_path(image_file, label_dir):
+    return os.path.join(label_dir, os.path.splitext(os.path.basename(image_file))[0] + '.txt')
+
+def is_up_to_date(image_file, label_dir):
+    """A label is up to date when it exists and is not older than its image."""
+    label_file = label_path(image_file, label_dir)
+    return os.path.exists(label_file) and os.path.getmtime(label_file) >= os.path.getmtime(image_file)
+
+def annotate_image(image_file, class_id, label_dir, overlay_dir=None, mode='largest', writer=None):
+    """Write the YOLO label (and optional overlay) of one image.
+
+    mode 'largest' keeps only the largest contour box, 'all' keeps every
+    contour box. An image without boxes gets an empty label file, which YOLO
+    treats as background, so it is not re-annotated on the next run.
+    Overlays are handed to writer (an image_io.AsyncImageWriter) when given.
+    """
+    with telemetry.timer('annotate'):
+        status = _annotate_image(image_file, class_id, label_dir, overlay_dir, mode, writer)
+    telemetry.count('images_annotated', status=status)
+    return status
+
+def _annotate_image(image_file, class_id, label_dir, overlay_dir, mode, writer):
+    image = cv2.imread(image_file)
+    if image is None:
+        return 'unreadable'
+    image_height, image_width = image.shape[:2]
+
+    boxes = canny_boxes(image)
+    if mode == 'largest' and boxes:
+        boxes = [max(boxes, key=lambda box: box[2] * box[3])]
+
+    with open(label_path(image_file, label_dir), 'w') as f:
+        for box in boxes:
+            f.write(yolo_bbox_line(class_id, box, image_width, image_height))
+
+    if overlay_dir:
+        annotated_image = image.copy()
+        for x, y, w, h in boxes:
+            cv2.rectangle(annotated_image, (x, y), (x + w, y + h), (0, 255, 0), 2)
+        if writer:
+            name = os.path.splitext(os.path.basename(image_file))[0]
+            writer.write_image(writer.image_path(overlay_dir, name), annotated_image)
+        else:
+            cv2.imwrite(os.path.join(overlay_dir, os.path.basename(image_file)), annotated_image)
+    return 'annotated' if boxes else 'empty'
+
+def annotate_chunk(options, chunk):
+    """Worker entry point: annotate a list of (image_file, class_id) pairs.
+
+    Overlay encoding runs on a small writer pool so it overlaps with the
+    next image's edge detection.
+    """
+    options = dict(options)
+    overlay_format = options.pop('overlay_format')
+    with AsyncImageWriter(overlay_format, num_threads=2, max_pending=8) as writer:
+        return [(image_file, annotate_image(image_file, class_id, writer=writer, **options))
+                for image_file, class_id in chunk]
+
+def annotate_directory(image_files, class_mapping, label_dir, overlay_dir=None, mode='largest',
+                       num_workers=None, chunk_size=64, force=False, overlay_format=None):
+    """Annotate images over a process pool, skipping those whose label is already up to date.
+
+    The class of every image comes from its filename prefix. Overlays are
+    written as overlay_format (an image_io.ImageFormat, PNG by default).
+    Returns a dict of counts per outcome and prints the throughput.
+    """
+    os.makedirs(label_dir, exist_ok=True)
+    if overlay_dir:
+        os.makedirs(overlay_dir, exist_ok=True)
+
+    counts = {'annotated': 0, 'empty': 0, 'unreadable': 0, 'unknown class': 0, 'up to date': 0}
+    todo = []
+    for image_file in sorted(image_files):
+        class_id = get_class_id(class_name_from_filename(image_file), class_mapping)
+        if class_id == -1:
+            print(f"Unknown class for {image_file}, skipping.")
+            counts['unknown class'] += 1
+        elif not force and is_up_to_date(image_file, label_dir):
+            counts['up to date'] += 1
+        else:
+            todo.append((image_file, class_id))
+
+    print(f"{len(todo)} images to annotate, {counts['up to date']} already up to date")
+    chunks = [todo[i:i + chunk_size] for i in range(0, len(todo), chunk_size)]
+    options = {'label_dir': label_dir, 'overlay_dir': overlay_dir, 'mode': mode, 'overlay_format': overlay_format}
+
+    start_time = time.perf_counter()
+    done = 0
+    if chunks:
+        with mp.Pool(min(num_workers or os.cpu_count(), len(chunks))) as pool:
+            task = telemetry.collect(partial(annotate_chunk, options))
+            for results in map(telemetry.merged, pool.imap_unordered(task, chunks)):
+                for image_file, status in results:
+                    counts[status] += 1
+                    if status == 'unreadable':
+                        print(f"Could not read {image_file}")
+                done += len(results)
+                elapsed = time.perf_counter() - start_time
+                print(f"{done}/{len(todo)} images annotated ({done / elapsed:.1f} images/s)")
+
+    elapsed = time.perf_counter() - start_time
+    rate = done / elapsed if elapsed > 0 else 0.0
+    print(f"Annotated {done} images in {elapsed:.1f}s ({rate:.1f} images/s); "
+          f"{counts['up to date']} up to date, {counts['empty']} without boxes, "
+          f"{counts['unknown class']} with unknown class.")
+    return counts
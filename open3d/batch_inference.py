@@ -0,0 +1,222 @@
+import cv2
+import json
+import os
+import queue
+import threading
+import time
+import telemetry
+from image_io import AsyncImageWriter, list_images
+from detections import detections_from_result, draw_detections
+from yolo_labels import yolo_bbox_line
+
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mov', '.mkv', '.webm')
+
+def is_video(path):
+    return os.path.splitext(path)[1].lower() in VIDEO_EXTENSIONS
+
+def iter_frames(source, frame_stride=1):
+    """Yield (name, BGR frame) for every frame of a video file or every image of a directory.
+
+    Video frames are named <video name>_<frame number>; with frame_stride
+    above 1 only every frame_stride-th frame is decoded.
+    """
+    if os.path.isdir(source):
+        for image_file in list_images(source)[::frame_stride]:
+            image = cv2.imread(image_file)
+            if image is None:
+                print(f"Could not read {image_file}, skipping.")
+                continue
+            yield os.path.splitext(os.path.basename(image_file))[0], image
+        return
+
+    if not is_video(source):
+        raise ValueError(f"{source} is neither a directory nor a video ({', '.join(VIDEO_EXTENSIONS)})")
+    cap = cv2.VideoCapture(source)
+    if not cap.isOpened():
+        raise IOError(f"Could not open video {source}")
+    stem = os.path.splitext(os.path.basename(source))[0]
+    index = 0
+    try:
+        while True:
+            # grab() skips the decode of frames that are strided over
+            if not cap.grab():
+                break
+            if index % frame_stride == 0:
+                ret, frame = cap.retrieve()
+                if not ret:
+                    break
+                yield f"{stem}_{index:06d}", frame
+            index += 1
+    finally:
+        cap.release()
+
+_DONE = object()
+
+def decode_in_background(sources, frame_stride=1, max_queued=64, poll=0.1):
+    """Decode every source on a background thread, yielding (source, name, frame).
+
+    At most max_queued decoded frames wait in memory; decoding pauses when
+    inference falls behind. Decoder errors are re-raised here. If the
+    consumer stops early (or closes the generator), the decoder stops within
+    poll seconds and the queued frames are dropped.
+    """
+    frames = queue.Queue(maxsize=max_queued)
+    stop = threading.Event()
+    errors = []
+
+    def put(item):
+        # A timed put, so a decoder waiting on a full queue notices the consumer has gone
+        while not stop.is_set():
+            try:
+                frames.put(item, timeout=poll)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def decode():
+        try:
+            for source in sources:
+                for name, frame in iter_frames(source, frame_stride):
+                    if not put((source, name, frame)):
+                        return
+        except Exception as e:
+            errors.append(e)
+        finally:
+            put(_DONE)
+
+    thread = threading.Thread(target=decode, daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = frames.get()
+            if item is _DONE:
+                break
+            yield item
+    finally:
+        stop.set()
+        while True:
+            try:
+                frames.get_nowait()
+            except queue.Empty:
+                break
+        thread.join()
+    if errors:
+        raise errors[0]
+
+def batched(items, batch_size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+class LabelSink:
+    """Writes one YOLO label file per frame (empty when nothing was detected)."""
+
+    def __init__(self, label_dir):
+        self.label_dir = label_dir
+        os.makedirs(label_dir, exist_ok=True)
+
+    def write(self, source, name, frame, detections, names):
+        height, width = frame.shape[:2]
+        with open(os.path.join(self.label_dir, name + '.txt'), 'w') as f:
+            for (x1, y1, x2, y2), class_id in zip(detections.xyxy.tolist(), detections.cls):
+                f.write(yolo_bbox_line(int(class_id), (x1, y1, x2 - x1, y2 - y1), width, height))
+
+    def close(self):
+        pass
+
+class JsonSink:
+    """Writes one JSON object per frame to a JSON Lines file."""
+
+    def __init__(self, json_path):
+        directory = os.path.dirname(json_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.file = open(json_path, 'w')
+
+    def write(self, source, name, frame, detections, names):
+        record = {
+            'source': source,
+            'name': name,
+            'detections': [{'class_id': int(class_id), 'class_name': names[int(class_id)],
+                            'confidence': round(float(confidence), 4),
+                            'xyxy': [round(float(v), 1) for v in box]}
+                           for box, confidence, class_id in zip(detections.xyxy, detections.conf, detections.cls)],
+        }
+        self.file.write(json.dumps(record) + '\n')
+
+    def close(self):
+        self.file.close()
+
+def run_batch(model, sources, batch_size=16, conf=0.5, imgsz=640, label_dir=None, json_path=None,
+              overlay_dir=None, overlay_format=None, frame_stride=1, max_queued=64):
+    """Run a YOLO model over video files and image directories in batches.
+
+    Frames are decoded on a background thread and passed to model.predict
+    batch_size at a time. Results go to a YOLO label directory and/or a
+    JSON Lines file; overlays with the boxes drawn are only written when
+    overlay_dir is given. Returns the number of frames processed.
+    """
+    sinks = []
+    if label_dir:
+        sinks.append(LabelSink(label_dir))
+    if json_path:
+        sinks.append(JsonSink(json_path))
+    writer = None
+    if overlay_dir:
+        os.makedirs(overlay_dir, exist_ok=True)
+        writer = AsyncImageWriter(overlay_format)
+
+    start_time = time.perf_counter()
+    done = 0
+    try:
+        for batch in batched(decode_in_background(sources, frame_stride, max_queued), batch_size):
+            with telemetry.timer('infer'):
+                results = model.predict([frame for _, _, frame in batch], conf=conf, imgsz=imgsz, verbose=False)
+            telemetry.count('frames_inferred', len(batch))
+            for (source, name, frame), result in zip(batch, results):
+                detections = detections_from_result(result)
+                for sink in sinks:
+                    sink.write(source, name, frame, detections, model.names)
+                if writer:
+                    with telemetry.timer('draw'):
+                        overlay = draw_detections(frame, detections, model.names)
+                    writer.write_image(writer.image_path(overlay_dir, name), overlay)
+            done += len(batch)
+            elapsed = time.perf_counter() - start_time
+            print(f"{done} frames processed ({done / elapsed:.1f} frames/s)")
+    finally:
+        for sink in sinks:
+            sink.close()
+        if writer:
+            writer.close()
+
+    elapsed = time.perf_counter() - start_time
+    rate = done / elapsed if elapsed > 0 else 0.0
+    print(f"Processed {done} frames in {elapsed:.1f}s ({rate:.1f} frames/s).")
+    return done
+
+if __name__ == "__main__":
+    from ultralytics import YOLO
+
+    # Parameters
+    model_path = "/home/zohaib/pytorch3d-renderer/open3d/yolo_training/experiment14/weights/best.pt"
+    sources = ["recordings/"]  # Video files and/or image directories
+    output_label_dir = "batch_inference/labels"
+    output_json_path = "batch_inference/detections.jsonl"
+    output_visualization_dir = None  # e.g. "batch_inference/annotated" to also save overlays
+    batch_size = 16
+
+    model = YOLO(model_path)
+    # Expand directories of videos into the individual files
+    expanded = []
+    for source in sources:
+        videos = sorted(os.path.join(source, f) for f in os.listdir(source) if is_video(f)) if os.path.isdir(source) else []
+        expanded.extend(videos or [source])
+    run_batch(model, expanded, batch_size=batch_size, label_dir=output_label_dir,
+              json_path=output_json_path, overlay_dir=output_visualization_dir)
@@ -0,0 +1,215 @@
+import contextlib
+import itertools
+import json
+import multiprocessing as mp
+import os
+import platform
+import queue
+import resource
+import tempfile
+import time
+import numpy as np
+from functools import partial
+
+def synthetic_mesh(num_triangles, seed=0, noise=0.05):
+    """Closed, bumpy UV sphere with about num_triangles triangles, as (vertices, faces) arrays.
+
+    Stands in for a product scan: the size is what matters to the pipeline,
+    and the noise keeps the silhouette from being trivially round.
+    """
+    rng = np.random.default_rng(seed)
+    segments = max(int(np.sqrt(num_triangles / 2)), 3)
+    rings = max(num_triangles // (2 * segments), 2)
+    theta = np.linspace(0, np.pi, rings + 1)[1:-1]
+    phi = np.linspace(0, 2 * np.pi, segments, endpoint=False)
+    theta, phi = np.meshgrid(theta, phi, indexing='ij')
+    radius = 1 + noise * rng.standard_normal(theta.shape)
+    ring_vertices = np.stack([radius * np.sin(theta) * np.cos(phi), radius * np.cos(theta),
+                              radius * np.sin(theta) * np.sin(phi)], axis=-1).reshape(-1, 3)
+    vertices = np.vstack([ring_vertices, [[0, 1, 0], [0, -1, 0]]])
+    top, bottom = len(ring_vertices), len(ring_vertices) + 1
+
+    grid = np.arange(len(ring_vertices)).reshape(rings - 1, segments)
+    right = np.roll(grid, -1, axis=1)
+    quads = np.stack([grid[:-1], grid[1:], right[1:], right[:-1]], axis=-1).reshape(-1, 4)
+    faces = np.vstack([quads[:, [0, 1, 2]], quads[:, [0, 2, 3]],
+                       np.stack([np.full(segments, top), right[0], grid[0]], axis=1),
+                       np.stack([np.full(segments, bottom), grid[-1], right[-1]], axis=1)])
+    return vertices, faces
+
+def write_obj(path, vertices, faces):
+    with open(path, 'w') as f:
+        np.savetxt(f, vertices, fmt='v %.6f %.6f %.6f')
+        np.savetxt(f, faces + 1, fmt='f %d %d %d')
+
+class StageTimer:
+    """Wall time and item counts per named stage."""
+
+    def __init__(self):
+        self.stages = {}
+
+    @contextlib.contextmanager
+    def time(self, name, items=1):
+        start = time.perf_counter()
+        yield
+        stage = self.stages.setdefault(name, {'wall_s': 0.0, 'items': 0})
+        stage['wall_s'] += time.perf_counter() - start
+        stage['items'] += items
+
+    def report(self):
+        return {name: dict(stage, items_per_s=stage['items'] / stage['wall_s'] if stage['wall_s'] > 0 else 0.0)
+                for name, stage in self.stages.items()}
+
+def run_config(config):
+    """Run every pipeline stage for one configuration in the current (fresh) process.
+
+    Stages: read_triangle_mesh, the mesh cache cold and warm, normals, the
+    serial render loop, PNG encode/write, the Canny annotator over
+    num_workers processes and the sharded parallel render of
+    main_nested_slicing over num_workers processes.
+    """
+    import open3d as o3d
+    from batch_annotate import annotate_directory
+    from image_io import image_format, list_images, write_image
+    from main_nested_slicing import make_shards, mesh_poses, render_shard
+    from mesh_cache import load_triangle_mesh
+    from render_backends import create_backend
+
+    os.chdir(config['work_dir'])
+    width, height = config['resolution']
+    num_images, num_workers = config['num_images'], config['num_workers']
+    timer = StageTimer()
+
+    obj_path = os.path.abspath(f"can_{config['num_triangles']}.obj")
+    if not os.path.exists(obj_path):
+        write_obj(obj_path, *synthetic_mesh(config['num_triangles']))
+
+    with timer.time('read_triangle_mesh'):
+        mesh = o3d.io.read_triangle_mesh(obj_path)
+    with timer.time('compute_vertex_normals'):
+        mesh.compute_vertex_normals()
+    # Everything but the shared mesh goes in a scratch directory removed after the run
+    with tempfile.TemporaryDirectory(dir=config['work_dir']) as scratch:
+        cache_dir = os.path.join(scratch, 'cache')
+        with timer.time('mesh_cache_cold'):
+            load_triangle_mesh(obj_path, cache_dir=cache_dir)
+        with timer.time('mesh_cache_warm'):
+            mesh = load_triangle_mesh(obj_path, cache_dir=cache_dir)
+
+        image_dir = os.path.join(scratch, 'images')
+        os.makedirs(image_dir)
+        fmt = image_format('png')
+        renderer = create_backend(config['backend'], mesh, width, height)
+        for i, rotation in enumerate(mesh_poses('can', num_images)):
+            with timer.time('render'):
+                frame = renderer.render(rotation)
+            with timer.time('encode_png'):
+                # Named like the renders so the annotator finds a known class
+                write_image(os.path.join(image_dir, f"can_{i:04d}.png"), frame.image, fmt, rgb=True)
+        renderer.close()
+
+        with timer.time('annotate', items=num_images):
+            annotate_directory(list_images(image_dir), {'can': 0}, os.path.join(image_dir, 'labels'),
+                               num_workers=num_workers, force=True)
+
+        shard_dir = os.path.join(scratch, 'shards')
+        os.makedirs(shard_dir)
+        render_options = {'output_dir': shard_dir, 'label_dir': None, 'seg_dir': None, 'label_source': 'projection',
+                          'backend': config['backend'], 'pose_sampler': 'turntable', 'output_format': fmt,
+                          'image_width': width, 'image_height': height}
+        shards = make_shards([obj_path], [0], num_images, frames_per_shard=-(-num_images // num_workers))
+        with timer.time('render_parallel', items=num_images):
+            with mp.get_context('spawn').Pool(num_workers) as pool:
+                pool.map(partial(render_shard, render_options), shards)
+
+    return dict(config, stages=timer.report(),
+                # ru_maxrss is in kilobytes on Linux
+                peak_rss_mb=resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+                peak_child_rss_mb=resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024)
+
+def sweep(mesh_triangles=(10_000, 100_000), resolutions=((640, 480), (1920, 1080)), image_counts=(32,),
+          worker_counts=(1, 4), backend='offscreen', output_path='benchmark_results.json', work_dir=None,
+          config_timeout=None):
+    """Benchmark every combination of the given sizes and write the results as JSON.
+
+    Each configuration runs in its own spawned process, so peak RSS is per
+    configuration and no state carries over between runs. A configuration
+    whose process dies (e.g. a renderer crash) or runs longer than
+    config_timeout seconds is recorded as failed and the sweep moves on.
+    """
+    work_dir = os.path.abspath(work_dir or tempfile.mkdtemp(prefix='pipeline_benchmark_'))
+    os.makedirs(work_dir, exist_ok=True)
+    configs = [{'num_triangles': t, 'resolution': r, 'num_images': n, 'num_workers': w, 'backend': backend,
+                'work_dir': work_dir}
+               for t, r, n, w in itertools.product(mesh_triangles, resolutions, image_counts, worker_counts)]
+
+    results, failures = [], []
+    ctx = mp.get_context('spawn')
+    for i, config in enumerate(configs):
+        # A plain process rather than a pool worker, since run_config starts pools of its own
+        returned = ctx.Queue()
+        process = ctx.Process(target=_run_into, args=(config, returned))
+        process.start()
+        result, error = _wait_for_result(process, returned, config_timeout)
+        if result is None:
+            print(f"Configuration {config} failed: {error}")
+            failures.append(dict(config, error=error))
+            continue
+        results.append(result)
+        stages = ", ".join(f"{name} {stage['wall_s']:.2f}s" for name, stage in result['stages'].items())
+        print(f"[{i+1}/{len(configs)}] {config['num_triangles']} triangles, {config['resolution'][0]}x"
+              f"{config['resolution'][1]}, {config['num_images']} images, {config['num_workers']} workers: {stages}")
+
+    report = {
+        'machine': {'platform': platform.platform(), 'python': platform.python_version(), 'cpu_count': os.cpu_count()},
+        'results': results,
+        'failures': failures,
+    }
+    with open(output_path, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results of {len(results)} configurations saved to {output_path}.")
+    return report
+
+def _wait_for_result(process, returned, timeout=None, poll=1.0):
+    """(result, None) from a configuration process, or (None, reason) if it failed, died or timed out."""
+    deadline = None if timeout is None else time.monotonic() + timeout
+    while True:
+        try:
+            result = returned.get(timeout=poll)
+            break
+        except queue.Empty:
+            pass
+        if not process.is_alive():
+            # It may have exited right after putting its result
+            try:
+                result = returned.get(timeout=poll)
+                break
+            except queue.Empty:
+                return None, f"process exited with code {process.exitcode}"
+        if deadline is not None and time.monotonic() > deadline:
+            process.terminate()
+            process.join()
+            return None, f"timed out after {timeout}s"
+    process.join()
+    if result is None:
+        return None, f"raised an exception (exit code {process.exitcode})"
+    return result, None
+
+def _run_into(config, returned):
+    try:
+        returned.put(run_config(config))
+    except BaseException:
+        returned.put(None)
+        raise
+
+if __name__ == "__main__":
+    # Parameters
+    mesh_triangles = (10_000, 100_000, 500_000)
+    resolutions = ((640, 480), (1920, 1080))
+    image_counts = (32,)
+    worker_counts = (1, os.cpu_count())
+    render_backend = 'offscreen'  # 'visualizer' needs a display (or Xvfb)
+    config_timeout = 1800  # Seconds before a stuck configuration is killed and recorded as failed
+
+    sweep(mesh_triangles, resolutions, image_counts, worker_counts, backend=render_backend,
+          config_timeout=config_timeout)
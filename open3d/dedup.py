@@ -0,0 +1,225 @@
+import json
+import os
+import shutil
+import cv2
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from image_io import RENDER_BACKGROUND, letterbox_bars, list_images
+from yolo_labels import class_name_from_filename
+
+def _dct_matrix(n):
+    """Orthonormal DCT-II matrix, so the 2D DCT of X is D @ X @ D.T."""
+    k = np.arange(n)[:, None]
+    d = np.cos(np.pi * (2 * np.arange(n)[None, :] + 1) * k / (2 * n)) * np.sqrt(2 / n)
+    d[0] /= np.sqrt(2)
+    return d.astype(np.float32)
+
+_DCT32 = _dct_matrix(32)
+
+def _pack_bits(bits):
+    """(N, 64) booleans -> (N,) uint64 hashes."""
+    return np.packbits(bits, axis=1).view('>u8').ravel().astype(np.uint64)
+
+def dhash_batch(grays):
+    """Difference hashes of an (N, 8, 9) uint8 stack: is each pixel brighter than its right neighbour."""
+    return _pack_bits((grays[:, :, 1:] > grays[:, :, :-1]).reshape(len(grays), 64))
+
+def phash_batch(grays):
+    """Perceptual hashes of an (N, 32, 32) stack: low 8x8 DCT frequencies above their median."""
+    coeffs = np.einsum('ij,njk,lk->nil', _DCT32, grays.astype(np.float32), _DCT32)[:, :8, :8].reshape(len(grays), 64)
+    # The DC term only reflects overall brightness, so it is left out of the median
+    median = np.median(coeffs[:, 1:], axis=1, keepdims=True)
+    return _pack_bits(coeffs > median)
+
+def popcount(values):
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(values)
+    return np.unpackbits(values.view(np.uint8).reshape(-1, 8), axis=1).sum(axis=1)
+
+def foreground_crop(image, background=RENDER_BACKGROUND, tolerance=12):
+    """The box around every pixel of a BGR image that differs from the flat render background, as grayscale.
+
+    background is RGB; letterbox padding bars count as background too, as
+    in augment.foreground_masks. On a full frame the hash is dominated by
+    the background, so different objects of similar size hash alike; the
+    crop hashes the object itself. Frames with no foreground are returned
+    whole.
+    """
+    mask = np.abs(image.astype(np.int16) - np.array(background[::-1], dtype=np.int16)).max(axis=2) > tolerance
+    mask &= ~letterbox_bars(image[None])[0]
+    rows = np.flatnonzero(mask.any(axis=1))
+    cols = np.flatnonzero(mask.any(axis=0))
+    if len(rows) > 0:
+        image = image[rows[0]:rows[-1] + 1, cols[0]:cols[-1] + 1]
+    return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+
+def _small_grays(image_file):
+    image = cv2.imread(image_file)
+    if image is None:
+        return None, None
+    image = foreground_crop(image)
+    return (cv2.resize(image, (9, 8), interpolation=cv2.INTER_AREA),
+            cv2.resize(image, (32, 32), interpolation=cv2.INTER_AREA))
+
+def hash_images(image_files, method='dhash', batch_size=256, num_threads=8):
+    """64-bit perceptual hash of the foreground crop of every image, as an (N,) uint64 array.
+
+    Images are decoded and shrunk on a thread pool (OpenCV releases the GIL)
+    and hashed batch_size at a time with NumPy. Unreadable images get hash
+    0 and are reported.
+    """
+    hashes = np.zeros(len(image_files), dtype=np.uint64)
+    with ThreadPoolExecutor(num_threads) as executor:
+        for start in range(0, len(image_files), batch_size):
+            batch = image_files[start:start + batch_size]
+            smalls = list(executor.map(_small_grays, batch))
+            ok = [i for i, (small, _) in enumerate(smalls) if small is not None]
+            for i, (small, _) in enumerate(smalls):
+                if small is None:
+                    print(f"Could not read {batch[i]}")
+            if not ok:
+                continue
+            if method == 'dhash':
+                batch_hashes = dhash_batch(np.stack([smalls[i][0] for i in ok]))
+            elif method == 'phash':
+                batch_hashes = phash_batch(np.stack([smalls[i][1] for i in ok]))
+            else:
+                raise ValueError(f"Unknown hash method {method!r}, expected 'dhash' or 'phash'")
+            hashes[start + np.array(ok)] = batch_hashes
+            print(f"{min(start + batch_size, len(image_files))}/{len(image_files)} images hashed...")
+    return hashes
+
+class HammingIndex:
+    """Finds stored 64-bit hashes within a Hamming distance of a query.
+
+    The hash is split into max_distance + 1 bands; two hashes that differ in
+    at most max_distance bits agree exactly on at least one band, so only
+    entries sharing a band value are compared, not the whole index.
+    """
+
+    def __init__(self, max_distance):
+        self.max_distance = max_distance
+        bands = max_distance + 1
+        edges = np.linspace(0, 64, bands + 1).round().astype(int)
+        self.masks = [np.uint64(((1 << (hi - lo)) - 1) << lo) for lo, hi in zip(edges[:-1], edges[1:])]
+        self.tables = [{} for _ in self.masks]
+        self.hashes = np.zeros(1024, dtype=np.uint64)
+        self.size = 0
+
+    def query(self, value):
+        """(position, distance) of the closest stored hash within max_distance, or None."""
+        candidates = set()
+        for mask, table in zip(self.masks, self.tables):
+            candidates.update(table.get(int(value & mask), ()))
+        if not candidates:
+            return None
+        candidates = np.fromiter(candidates, dtype=np.int64)
+        distances = popcount(self.hashes[candidates] ^ value)
+        best = distances.argmin()
+        if distances[best] > self.max_distance:
+            return None
+        return int(candidates[best]), int(distances[best])
+
+    def add(self, value):
+        position = self.size
+        if position == len(self.hashes):
+            self.hashes = np.concatenate([self.hashes, np.zeros_like(self.hashes)])
+        self.hashes[position] = value
+        self.size += 1
+        for mask, table in zip(self.masks, self.tables):
+            table.setdefault(int(value & mask), []).append(position)
+        return position
+
+def class_group(image_file):
+    """Dedup group of an image: its class prefix, or one shared group when the name has none (image001.png)."""
+    name = os.path.splitext(os.path.basename(image_file))[0]
+    return class_name_from_filename(name) if '_' in name else ''
+
+def find_duplicates(image_files, hashes, max_distance=6, group=class_group):
+    """Greedy grouping in file order: {duplicate file: (kept file, distance)}.
+
+    An image is a duplicate when it is within max_distance bits of an image
+    already kept from the same group (by default its class, the filename
+    prefix, see class_group), so of a run of near-identical consecutive
+    renders the first is kept and one class never thins out another.
+    """
+    indexes = {}
+    duplicates = {}
+    for image_file, value in zip(image_files, hashes):
+        index, kept = indexes.setdefault(group(image_file), (HammingIndex(max_distance), []))
+        match = index.query(value)
+        if match is None:
+            index.add(value)
+            kept.append(image_file)
+        else:
+            duplicates[image_file] = (kept[match[0]], match[1])
+    return duplicates
+
+def _sample_files(image_file, label_dirs, targets):
+    """(path, target directory) of an image and each of its existing label files."""
+    name = os.path.splitext(os.path.basename(image_file))[0]
+    files = [(image_file, targets[0])]
+    for label_dir, target in zip(label_dirs, targets[1:]):
+        label_file = os.path.join(label_dir, name + '.txt')
+        if os.path.exists(label_file):
+            files.append((label_file, target))
+    return files
+
+def _link(source, target):
+    if os.path.exists(target):
+        os.remove(target)
+    os.link(source, target)
+
+def dedup_dataset(image_dir, label_dirs, method='dhash', max_distance=6, action='link', output_dir=None,
+                  report_path=None, group=class_group):
+    """Remove near-duplicate images from a dataset, keeping their labels consistent.
+
+    action 'link' builds a deduplicated copy in output_dir (images/ and one
+    directory per label dir, named like it) out of hard links, leaving the
+    source untouched. action 'drop' moves every duplicate image and its
+    label files from every label dir into output_dir instead. action
+    'report' changes nothing. The duplicate -> kept mapping is saved as
+    JSON to report_path when given. group maps an image file to the group
+    it is deduplicated within (see find_duplicates). Returns that mapping.
+    """
+    image_files = list_images(image_dir)
+    hashes = hash_images(image_files, method)
+    duplicates = find_duplicates(image_files, hashes, max_distance, group)
+    kept = [f for f in image_files if f not in duplicates]
+    print(f"{len(duplicates)} of {len(image_files)} images are within {max_distance} bits of a kept image.")
+
+    if action in ('link', 'drop'):
+        if output_dir is None:
+            raise ValueError(f"action {action!r} needs an output_dir")
+        targets = [os.path.join(output_dir, 'images')]
+        targets += [os.path.join(output_dir, os.path.basename(os.path.normpath(d))) for d in label_dirs]
+        for target in targets:
+            os.makedirs(target, exist_ok=True)
+        # link: the kept images form the new dataset; drop: the duplicates leave the old one
+        for image_file in (kept if action == 'link' else duplicates):
+            for path, target in _sample_files(image_file, label_dirs, targets):
+                if action == 'link':
+                    _link(path, os.path.join(target, os.path.basename(path)))
+                else:
+                    shutil.move(path, os.path.join(target, os.path.basename(path)))
+        verb = 'Linked' if action == 'link' else 'Moved'
+        print(f"{verb} {len(kept) if action == 'link' else len(duplicates)} images and their labels to {output_dir}.")
+    elif action != 'report':
+        raise ValueError(f"Unknown action {action!r}, expected 'link', 'drop' or 'report'")
+
+    if report_path:
+        with open(report_path, 'w') as f:
+            json.dump({dup: {'kept': keep, 'distance': distance} for dup, (keep, distance) in duplicates.items()},
+                      f, indent=2)
+    return duplicates
+
+if __name__ == "__main__":
+    # Parameters
+    image_directory = 'train/images'
+    label_directories = ['train/labels', 'train/labels_seg']  # Missing directories are skipped
+    hash_method = 'dhash'  # 'dhash' (fast) or 'phash' (more robust to small shifts)
+    max_distance = 6  # Hamming distance out of 64 bits under which two frames count as duplicates
+    action = 'link'  # 'link' builds train_dedup/ from hard links, 'drop' moves duplicates there, 'report' only lists
+
+    dedup_dataset(image_directory, [d for d in label_directories if os.path.isdir(d)], hash_method, max_distance,
+                  action, output_dir='train_dedup', report_path='duplicates.json')
@@ -0,0 +1,31 @@
+import cv2
+import numpy as np
+from collections import namedtuple
+
+# xyxy: (n, 4) float32 pixel corners, conf: (n,) float32, cls: (n,) int64,
+# track_id: (n,) int64 with -1 for boxes the tracker has not assigned yet.
+Detections = namedtuple('Detections', ['xyxy', 'conf', 'cls', 'track_id'])
+
+def empty_detections():
+    return Detections(np.zeros((0, 4), dtype=np.float32), np.zeros(0, dtype=np.float32),
+                      np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64))
+
+def detections_from_result(result):
+    """Plain NumPy copy of an Ultralytics result's boxes, detached from the model's tensors."""
+    boxes = result.boxes
+    if boxes is None or len(boxes) == 0:
+        return empty_detections()
+    track_id = boxes.id.cpu().numpy().astype(np.int64) if boxes.id is not None else np.full(len(boxes), -1, dtype=np.int64)
+    return Detections(boxes.xyxy.cpu().numpy().astype(np.float32), boxes.conf.cpu().numpy().astype(np.float32),
+                      boxes.cls.cpu().numpy().astype(np.int64), track_id)
+
+def draw_detections(frame, detections, names):
+    """Draw boxes and "name: confidence" labels onto a BGR frame in place."""
+    for (xmin, ymin, xmax, ymax), confidence, class_id in zip(detections.xyxy.astype(int), detections.conf, detections.cls):
+        # Draw the bounding box
+        cv2.rectangle(frame, (xmin, ymin), (xmax, ymax), (0, 255, 0), 2)
+
+        # Put the label above the bounding box
+        label = f"{names[int(class_id)]}: {confidence:.2f}"
+        cv2.putText(frame, label, (xmin, ymin - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.9, (0, 255, 0), 2)
+    return frame
@@ -0,0 +1,103 @@
+import json
+import multiprocessing as mp
+import os
+import resource
+import time
+import numpy as np
+import cv2
+import yaml
+from image_io import list_images
+from model_backends import BACKENDS, export_model, load_model
+
+def validation_images(data):
+    """Image files of the val split of a data YAML (a directory or one with an images/ subdirectory)."""
+    with open(data) as f:
+        config = yaml.safe_load(f)
+    val_dir = os.path.join(config.get('path', ''), config['val'])
+    return list_images(os.path.join(val_dir, 'images')) or list_images(val_dir)
+
+def benchmark_backend(weights, backend, data, imgsz=640, max_images=200, warmup=5):
+    """Load time, single-image latency, peak memory and mAP of one backend.
+
+    Meant to run in a fresh process, so the load time includes runtime
+    initialization and the peak RSS belongs to this backend alone.
+    peak_rss_mb is sampled after loading and the latency runs, before
+    validation, so it is what inference needs; val_peak_rss_mb also covers
+    validation's dataloader.
+    """
+    images = [cv2.imread(image_file) for image_file in validation_images(data)[:max_images]]
+    if not images:
+        raise ValueError(f"No validation images found for {data}")
+
+    start = time.perf_counter()
+    model = load_model(weights, backend)
+    # The first call builds the graph / compiles the network, so count it as loading
+    model.predict(images[0], imgsz=imgsz, verbose=False)
+    load_time = time.perf_counter() - start
+
+    for image in images[:warmup]:
+        model.predict(image, imgsz=imgsz, verbose=False)
+    latencies = []
+    for image in images:
+        start = time.perf_counter()
+        model.predict(image, imgsz=imgsz, verbose=False)
+        latencies.append(time.perf_counter() - start)
+    latencies = np.array(latencies) * 1000
+    # ru_maxrss is in kilobytes on Linux
+    peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+    metrics = model.val(data=data, imgsz=imgsz, batch=1, plots=False, verbose=False)
+    return {
+        'backend': backend,
+        'mAP50': float(metrics.box.map50),
+        'mAP50-95': float(metrics.box.map),
+        'p50_ms': float(np.percentile(latencies, 50)),
+        'p99_ms': float(np.percentile(latencies, 99)),
+        'load_s': load_time,
+        'peak_rss_mb': peak_rss_mb,
+        'val_peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+def _benchmark_task(args):
+    return benchmark_backend(*args)
+
+def compare_backends(weights, data, backends=tuple(BACKENDS), imgsz=640, max_images=200, results_path=None):
+    """Export weights to every backend and benchmark them one after another.
+
+    Each backend runs in its own spawned process, one at a time, so the
+    latencies are not skewed by each other and memory is measured
+    separately. Prints a side-by-side table and optionally saves JSON.
+    """
+    for backend in backends:
+        print(f"Exporting {backend}...")
+        export_model(weights, backend, imgsz=imgsz, data=data)
+
+    results = []
+    ctx = mp.get_context('spawn')
+    for backend in backends:
+        print(f"Benchmarking {backend}...")
+        with ctx.Pool(1) as pool:
+            results.append(pool.map(_benchmark_task, [(weights, backend, data, imgsz, max_images)])[0])
+
+    print(f"{'backend':<16}{'mAP50':>8}{'mAP50-95':>10}{'p50 ms':>9}{'p99 ms':>9}{'load s':>8}{'RSS MB':>9}")
+    for r in results:
+        print(f"{r['backend']:<16}{r['mAP50']:>8.3f}{r['mAP50-95']:>10.3f}{r['p50_ms']:>9.1f}"
+              f"{r['p99_ms']:>9.1f}{r['load_s']:>8.2f}{r['peak_rss_mb']:>9.0f}")
+    if results_path:
+        with open(results_path, 'w') as f:
+            json.dump(results, f, indent=2)
+    return results
+
+def fastest_backend(results, min_map50):
+    """Name of the lowest-p50 backend whose mAP50 is at least min_map50, or None."""
+    eligible = [r for r in results if r['mAP50'] >= min_map50]
+    return min(eligible, key=lambda r: r['p50_ms'])['backend'] if eligible else None
+
+if __name__ == "__main__":
+    # Parameters
+    weights = "/home/zohaib/pytorch3d-renderer/open3d/yolo_training/experiment14/weights/best.pt"
+    data_yaml = "data_holdout.yaml"  # Its val split should hold rendered images not used in training
+    min_map50 = 0.9  # Accuracy bar a backend must meet to be shipped
+
+    results = compare_backends(weights, data_yaml, results_path="backend_benchmark.json")
+    print(f"Fastest backend with mAP50 >= {min_map50}: {fastest_backend(results, min_map50)}")
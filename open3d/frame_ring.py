@@ -0,0 +1,220 @@
+import multiprocessing as mp
+import time
+import cv2
+import numpy as np
+from multiprocessing import shared_memory
+
+# Header: latest published sequence number, latest claimed sequence number,
+# slot of the latest published frame, then the slot pinned by each reader
+# (-1 for none), then one sequence number and one capture timestamp per slot.
+_WRITE_SEQ, _CLAIM_SEQ, _WRITE_SLOT, _PINS = 0, 1, 2, 3
+
+class FrameRing:
+    """Ring of fixed-size frames in shared memory, passed between processes without copies.
+
+    The writer never fills the slot of the latest published frame or a slot
+    a reader has claimed, so a claimed view stays intact until that reader
+    claims its next frame (or releases it); this needs slots >= readers + 2.
+    A slot's sequence number is negated while the writer fills it. Slot
+    choice and claims happen under a shared lock, so several inference
+    processes (reader 0, 1, ...) never take the same frame.
+    """
+
+    def __init__(self, shape, slots=4, name=None, create=False, lock=None, readers=1):
+        if slots < readers + 2:
+            raise ValueError(f"A ring for {readers} readers needs at least {readers + 2} slots, got {slots}")
+        self.shape = tuple(shape)
+        self.slots = slots
+        self.readers = readers
+        self.lock = lock
+        frame_bytes = int(np.prod(self.shape))
+        header_len = _PINS + readers + slots
+        header_bytes = 8 * (header_len + slots)
+        if create:
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=header_bytes + slots * frame_bytes)
+        else:
+            # Processes started from the owner share its resource tracker, so attaching needs no extra bookkeeping
+            self.shm = shared_memory.SharedMemory(name=name)
+        self.name = self.shm.name
+        self.header = np.ndarray(header_len, dtype=np.int64, buffer=self.shm.buf)
+        self.pins = self.header[_PINS:_PINS + readers]
+        self.slot_seqs = self.header[_PINS + readers:]
+        self.timestamps = np.ndarray(slots, dtype=np.float64, buffer=self.shm.buf, offset=8 * header_len)
+        self.frames = np.ndarray((slots,) + self.shape, dtype=np.uint8, buffer=self.shm.buf, offset=header_bytes)
+        if create:
+            self.header[:] = 0
+            self.header[_WRITE_SLOT] = -1
+            self.pins[:] = -1
+
+    @property
+    def write_seq(self):
+        return int(self.header[_WRITE_SEQ])
+
+    def slot_seq(self, slot):
+        return int(self.slot_seqs[slot])
+
+    def begin_write(self):
+        """(sequence number, writable view) of the next free slot; call end_write once it is filled."""
+        with self.lock:
+            seq = self.write_seq + 1
+            busy = {int(self.header[_WRITE_SLOT])} | {int(pin) for pin in self.pins}
+            slot = (int(self.header[_WRITE_SLOT]) + 1) % self.slots
+            while slot in busy:
+                slot = (slot + 1) % self.slots
+            self.slot_seqs[slot] = -seq
+        self.filling = slot
+        return seq, self.frames[slot]
+
+    def end_write(self, seq):
+        slot = self.filling
+        self.timestamps[slot] = time.perf_counter()
+        with self.lock:
+            self.slot_seqs[slot] = seq
+            self.header[_WRITE_SLOT] = slot
+            self.header[_WRITE_SEQ] = seq
+
+    def write(self, frame):
+        seq, view = self.begin_write()
+        view[...] = frame
+        self.end_write(seq)
+        return seq
+
+    def claim(self, reader=0, timeout=None, poll=0.0005):
+        """Claim the newest unclaimed frame for reader: (sequence number, view, capture time), or None on timeout.
+
+        Frames published while the reader was busy are skipped, so every
+        claim returns the freshest frame. The reader's previous frame is
+        released.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self.lock:
+                seq = self.write_seq
+                if seq > self.header[_CLAIM_SEQ]:
+                    slot = int(self.header[_WRITE_SLOT])
+                    self.header[_CLAIM_SEQ] = seq
+                    self.pins[reader] = slot
+                    return seq, self.frames[slot], float(self.timestamps[slot])
+            if deadline is not None and time.monotonic() > deadline:
+                return None
+            time.sleep(poll)
+
+    def release(self, reader=0):
+        """Hand the reader's claimed slot back to the writer."""
+        self.pins[reader] = -1
+
+    def is_current(self, seq):
+        """Whether frame seq is still in its slot (always true for a frame its reader has not released)."""
+        return bool(np.any(self.slot_seqs == seq))
+
+    def close(self):
+        # The views must go before the mapping can be closed
+        del self.header, self.pins, self.slot_seqs, self.timestamps, self.frames
+        self.shm.close()
+
+    def unlink(self):
+        self.shm.unlink()
+
+def capture_process(source, slots, lock, info, stop, width=None, height=None, readers=1):
+    """Read frames from a camera or video straight into a FrameRing for readers readers it creates.
+
+    The ring's name and frame shape are sent through the info queue once
+    the first frame has been read; None is sent if the source cannot be
+    opened.
+    """
+    cap = cv2.VideoCapture(source)
+    if width and height:
+        cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+    ret, frame = cap.read() if cap.isOpened() else (False, None)
+    if not ret:
+        info.put(None)
+        return
+
+    ring = FrameRing(frame.shape, slots, create=True, lock=lock, readers=readers)
+    ring.write(frame)
+    info.put((ring.name, frame.shape))
+    try:
+        while not stop.is_set():
+            seq, view = ring.begin_write()
+            # Decode directly into shared memory; backends that ignore the buffer return a frame of their own
+            ret, frame = cap.read(view)
+            if not ret:
+                break
+            if frame is not view:
+                np.copyto(view, frame)
+            ring.end_write(seq)
+    finally:
+        cap.release()
+        stop.set()
+        ring.close()
+        ring.unlink()
+
+def start_capture(source, slots=4, width=None, height=None, timeout=10.0, readers=1):
+    """Start capture_process and attach to its ring for readers readers; returns (ring, process, stop event)."""
+    ctx = mp.get_context('spawn')
+    lock, info, stop = ctx.Lock(), ctx.Queue(), ctx.Event()
+    process = ctx.Process(target=capture_process, args=(source, slots, lock, info, stop, width, height, readers),
+                          daemon=True)
+    process.start()
+    ring_info = info.get(timeout=timeout)
+    if ring_info is None:
+        process.join()
+        raise IOError(f"Could not read from {source}")
+    name, shape = ring_info
+    return FrameRing(shape, slots, name=name, lock=lock, readers=readers), process, stop
+
+def run_ring_live(source, detect_rgb, names, slots=4, window_name='YOLO Webcam Inference', show=True, report_every=2.0):
+    """Live inference on frames captured by a separate process into shared memory.
+
+    Each claimed frame is converted to RGB in place in its slot and given
+    to detect_rgb without any copy; only the displayed frame is copied.
+    Prints the inference latency, capture-to-display latency, FPS and how
+    many frames were skipped.
+    """
+    from detections import draw_detections
+
+    ring, process, stop = start_capture(source, slots)
+    last_seq = shown = skipped = torn = 0
+    infer_ms = glass_to_box_ms = 0.0
+    start_time = last_report = time.perf_counter()
+    try:
+        while not stop.is_set():
+            claimed = ring.claim(timeout=0.1)
+            if claimed is None:
+                continue
+            seq, view, captured = claimed
+            skipped += seq - last_seq - 1
+            last_seq = seq
+
+            cv2.cvtColor(view, cv2.COLOR_BGR2RGB, dst=view)
+            start = time.perf_counter()
+            detections = detect_rgb(view)
+            infer_ms = (time.perf_counter() - start) * 1000
+            frame = cv2.cvtColor(view, cv2.COLOR_RGB2BGR)
+            if not ring.is_current(seq):
+                # Cannot happen while the slot is pinned; guards against a misconfigured ring
+                torn += 1
+                continue
+
+            draw_detections(frame, detections, names)
+            if show:
+                cv2.imshow(window_name, frame)
+                # Press 'q' to quit
+                if cv2.waitKey(1) & 0xFF == ord('q'):
+                    break
+            shown += 1
+            glass_to_box_ms = (time.perf_counter() - captured) * 1000
+
+            now = time.perf_counter()
+            if now - last_report >= report_every:
+                print(f"infer {infer_ms:.1f} ms | glass-to-box {glass_to_box_ms:.1f} ms | "
+                      f"{shown / (now - start_time):.1f} FPS | skipped {skipped} | torn {torn}")
+                last_report = now
+    finally:
+        stop.set()
+        process.join(timeout=2.0)
+        ring.close()
+        if show:
+            cv2.destroyAllWindows()
+    return shown
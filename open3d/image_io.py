@@ -0,0 +1,136 @@
+import cv2
+import glob
+import os
+import numpy as np
+import threading
+import telemetry
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.webp')
+
+# Renders come out on the renderers' white background; letterboxed ones are padded with YOLO's grey
+RENDER_BACKGROUND = (255, 255, 255)
+LETTERBOX_FILL = (114, 114, 114)
+
+ImageFormat = namedtuple('ImageFormat', ['name', 'extension', 'params'])
+
+def image_format(name='png', quality=None):
+    """Encoding settings by name.
+
+    'png' is lossless PNG at zlib's usual level 6 (quality overrides the 0-9
+    compression level), 'png-fast' is lossless PNG at level 1, 'jpeg' and
+    'webp' are lossy with quality 0-100 (webp above 100 is lossless).
+    """
+    if name == 'png':
+        return ImageFormat(name, '.png', [cv2.IMWRITE_PNG_COMPRESSION, 6 if quality is None else quality])
+    if name == 'png-fast':
+        return ImageFormat(name, '.png', [cv2.IMWRITE_PNG_COMPRESSION, 1])
+    if name == 'jpeg':
+        return ImageFormat(name, '.jpg', [cv2.IMWRITE_JPEG_QUALITY, 95 if quality is None else quality])
+    if name == 'webp':
+        return ImageFormat(name, '.webp', [cv2.IMWRITE_WEBP_QUALITY, 90 if quality is None else quality])
+    raise ValueError(f"Unknown image format {name!r}, expected 'png', 'png-fast', 'jpeg' or 'webp'")
+
+def list_images(directory):
+    """Every image in directory with one of IMAGE_EXTENSIONS, sorted."""
+    image_files = []
+    for extension in IMAGE_EXTENSIONS:
+        image_files.extend(glob.glob(os.path.join(directory, f"*{extension}")))
+    return sorted(image_files)
+
+def training_render_size(width, height, size):
+    """Largest width x height with the same aspect ratio that fits in a size x size square."""
+    scale = size / max(width, height)
+    return round(width * scale), round(height * scale)
+
+def letterbox_geometry(width, height, size):
+    """Scale, (left, top) padding and scaled (width, height) of a width x height image letterboxed into size x size.
+
+    Rounds like Ultralytics' LetterBox(auto=False), so a pre-letterboxed image
+    goes through training untouched.
+    """
+    scale = min(size / width, size / height)
+    new_width, new_height = round(width * scale), round(height * scale)
+    left = round((size - new_width) / 2 - 0.1)
+    top = round((size - new_height) / 2 - 0.1)
+    return scale, (left, top), (new_width, new_height)
+
+def letterbox(image, size, color=LETTERBOX_FILL, interpolation=cv2.INTER_LINEAR):
+    """Resize image to fit a size x size square and pad the rest with color, as YOLO does."""
+    height, width = image.shape[:2]
+    _, (left, top), (new_width, new_height) = letterbox_geometry(width, height, size)
+    if (new_width, new_height) != (width, height):
+        image = cv2.resize(image, (new_width, new_height), interpolation=interpolation)
+    return cv2.copyMakeBorder(image, top, size - new_height - top, left, size - new_width - left,
+                              cv2.BORDER_CONSTANT, value=color)
+
+def letterbox_bars(images, fill=LETTERBOX_FILL, tolerance=2):
+    """(N, H, W) mask of the letterbox padding: whole rows and columns of fill colour running in from an edge."""
+    is_fill = (np.abs(images.astype(np.int16) - np.array(fill[::-1], dtype=np.int16)) <= tolerance).all(axis=3)
+    rows, cols = is_fill.all(axis=2), is_fill.all(axis=1)
+    # A bar is the unbroken run of fill lines from the top/bottom (left/right) edge
+    rows = np.cumprod(rows, axis=1).astype(bool) | np.cumprod(rows[:, ::-1], axis=1)[:, ::-1].astype(bool)
+    cols = np.cumprod(cols, axis=1).astype(bool) | np.cumprod(cols[:, ::-1], axis=1)[:, ::-1].astype(bool)
+    return rows[:, :, None] | cols[:, None, :]
+
+def write_image(path, image, fmt, rgb=False):
+    """Encode and write a uint8 image; rgb images are converted to OpenCV's BGR first."""
+    with telemetry.timer('encode'):
+        if rgb:
+            image = cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
+        if not cv2.imwrite(path, image, fmt.params):
+            raise IOError(f"Could not write {path}")
+    telemetry.count('images_written')
+
+class AsyncImageWriter:
+    """Encodes and writes images on a thread pool.
+
+    OpenCV releases the GIL while encoding, so several frames are compressed
+    in parallel. At most max_pending writes are in flight; beyond that the
+    producer blocks, which keeps memory bounded when the disk falls behind.
+    """
+
+    def __init__(self, fmt=None, num_threads=4, max_pending=32):
+        self.format = fmt or image_format()
+        self.executor = ThreadPoolExecutor(max_workers=num_threads)
+        self.slots = threading.BoundedSemaphore(max_pending)
+        self.errors = []
+
+    def _done(self, future):
+        self.slots.release()
+        if future.exception() is not None:
+            self.errors.append(future.exception())
+
+    def _submit(self, fn, *args):
+        if self.errors:
+            raise self.errors[0]
+        self.slots.acquire()
+        self.executor.submit(fn, *args).add_done_callback(self._done)
+
+    def image_path(self, directory, name):
+        """Output path of an image called name, with this writer's extension."""
+        return os.path.join(directory, name + self.format.extension)
+
+    def write_image(self, path, image, rgb=False):
+        """Queue an image; the caller must not modify it afterwards."""
+        self._submit(write_image, path, image, self.format, rgb)
+
+    def write_text(self, path, lines):
+        self._submit(_write_lines, path, lines)
+
+    def close(self):
+        """Wait for every queued write and re-raise the first failure."""
+        self.executor.shutdown(wait=True)
+        if self.errors:
+            raise self.errors[0]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def _write_lines(path, lines):
+    with open(path, 'w') as f:
+        f.writelines(lines)
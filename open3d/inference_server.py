@@ -0,0 +1,204 @@
+import asyncio
+import time
+import numpy as np
+import cv2
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+import telemetry
+from detections import Detections, detections_from_result, empty_detections
+
+# Ultralytics' bytetrack.yaml defaults
+BYTETRACK_ARGS = SimpleNamespace(tracker_type='bytetrack', track_high_thresh=0.25, track_low_thresh=0.1,
+                                 new_track_thresh=0.25, track_buffer=30, match_thresh=0.8, fuse_score=True)
+
+def open_capture(source):
+    """VideoCapture for a device index (int or digit string) or a video file / stream URL."""
+    if isinstance(source, str) and source.isdigit():
+        source = int(source)
+    cap = cv2.VideoCapture(source)
+    if not cap.isOpened():
+        raise IOError(f"Could not open stream {source}")
+    return cap
+
+def tracked_detections(tracker, result, frame):
+    """Run one stream's BYTETracker on a batched result and return its tracked boxes."""
+    boxes = result.boxes.cpu().numpy()
+    tracks = tracker.update(boxes, frame)
+    if len(tracks) == 0:
+        return empty_detections()
+    # Tracker rows: x1, y1, x2, y2, track id, score, class, detection index
+    return Detections(tracks[:, :4].astype(np.float32), tracks[:, 5].astype(np.float32),
+                      tracks[:, 6].astype(np.int64), tracks[:, 4].astype(np.int64))
+
+class InferenceServer:
+    """One model serving several camera or video streams from a single process.
+
+    Every stream is read by its own asyncio task (the blocking reads run in
+    threads) into a latest-frame slot. One inference task gathers the fresh
+    frames of all streams into a single batched predict call, runs each
+    stream's own BYTETracker on its result and publishes the detections to
+    that stream's subscribers. Each published item is a dict with the
+    stream name, frame index, frame, detections and capture-to-result
+    latency; None marks the end of a stream.
+    """
+
+    def __init__(self, model, sources, max_batch=8, max_wait_ms=5.0, conf=0.5, imgsz=640, track=True,
+                 realtime_files=True):
+        self.model = model
+        self.sources = dict(sources)
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.conf = conf
+        self.imgsz = imgsz
+        self.realtime_files = realtime_files
+        self.latest = {}
+        self.dropped = {name: 0 for name in self.sources}
+        self.finished = set()
+        self.failed = {}
+        self.subscribers = {name: [] for name in self.sources}
+        self.trackers = {}
+        if track:
+            from ultralytics.trackers.byte_tracker import BYTETracker
+            self.trackers = {name: BYTETracker(BYTETRACK_ARGS, frame_rate=30) for name in self.sources}
+        self.stats = {'batches': 0, 'frames': 0, 'infer_s': 0.0}
+        # The model is shared, so forward passes run one at a time on a dedicated thread
+        self.model_executor = ThreadPoolExecutor(max_workers=1)
+        self.fresh = None
+
+    def subscribe(self, name, maxsize=4):
+        """Queue receiving the results of stream name; the oldest result is dropped when it is full."""
+        queue = asyncio.Queue(maxsize=maxsize)
+        self.subscribers[name].append(queue)
+        return queue
+
+    def _publish(self, name, item):
+        for queue in self.subscribers[name]:
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(item)
+
+    async def _read_stream(self, name, source):
+        loop = asyncio.get_running_loop()
+        cap = None
+        index = 0
+        try:
+            cap = await loop.run_in_executor(None, open_capture, source)
+            is_file = not (isinstance(source, int) or str(source).isdigit())
+            frame_time = 1 / (cap.get(cv2.CAP_PROP_FPS) or 30)
+            while True:
+                start = time.perf_counter()
+                ret, frame = await loop.run_in_executor(None, cap.read)
+                if not ret:
+                    break
+                if name in self.latest:
+                    self.dropped[name] += 1
+                self.latest[name] = (index, time.perf_counter(), frame)
+                self.fresh.set()
+                index += 1
+                if is_file and self.realtime_files:
+                    # Play files back at their own frame rate, like a live camera
+                    await asyncio.sleep(max(0.0, frame_time - (time.perf_counter() - start)))
+        except Exception as error:
+            # A stream that cannot be opened or read ends on its own; the others keep being served
+            self.failed[name] = str(error)
+            print(f"[{name}] stream failed: {error}")
+        finally:
+            if cap is not None:
+                cap.release()
+            self.finished.add(name)
+            self.fresh.set()
+
+    def _predict(self, frames):
+        start = time.perf_counter()
+        results = self.model.predict(frames, conf=self.conf, imgsz=self.imgsz, verbose=False)
+        elapsed = time.perf_counter() - start
+        self.stats['infer_s'] += elapsed
+        telemetry.observe('stage_seconds', elapsed, stage='infer')
+        telemetry.count('frames_inferred', len(frames))
+        return results
+
+    async def _infer_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await self.fresh.wait()
+            if len(self.latest) < min(self.max_batch, len(self.sources) - len(self.finished)):
+                # Give the other streams a moment to deliver, so they share the forward pass
+                await asyncio.sleep(self.max_wait)
+            self.fresh.clear()
+
+            names = list(self.latest)[:self.max_batch]
+            batch = [(name, *self.latest.pop(name)) for name in names]
+            if batch:
+                results = await loop.run_in_executor(self.model_executor, self._predict,
+                                                     [frame for _, _, _, frame in batch])
+                self.stats['batches'] += 1
+                self.stats['frames'] += len(batch)
+                for (name, index, captured, frame), result in zip(batch, results):
+                    if name in self.trackers:
+                        detections = tracked_detections(self.trackers[name], result, frame)
+                    else:
+                        detections = detections_from_result(result)
+                    self._publish(name, {'stream': name, 'index': index, 'frame': frame, 'detections': detections,
+                                         'latency_ms': (time.perf_counter() - captured) * 1000})
+            if self.latest:
+                self.fresh.set()
+            elif len(self.finished) == len(self.sources):
+                break
+
+        for name in self.sources:
+            self._publish(name, None)
+
+    async def run(self):
+        """Serve until every stream has ended or failed; returns the batching statistics and the failed streams."""
+        self.fresh = asyncio.Event()
+        readers = [asyncio.create_task(self._read_stream(name, source)) for name, source in self.sources.items()]
+        start = time.perf_counter()
+        try:
+            await self._infer_loop()
+        finally:
+            for reader in readers:
+                reader.cancel()
+            await asyncio.gather(*readers, return_exceptions=True)
+            self.model_executor.shutdown(wait=False)
+        elapsed = time.perf_counter() - start
+        return {
+            'frames': self.stats['frames'],
+            'fps': self.stats['frames'] / elapsed if elapsed > 0 else 0.0,
+            'mean_batch': self.stats['frames'] / max(self.stats['batches'], 1),
+            'infer_ms_per_frame': 1000 * self.stats['infer_s'] / max(self.stats['frames'], 1),
+            'dropped': dict(self.dropped),
+            'failed': dict(self.failed),
+        }
+
+async def print_results(server, name, report_every=30):
+    """Example subscriber: prints the detection count and latency of every report_every-th frame."""
+    queue = server.subscribe(name)
+    while True:
+        item = await queue.get()
+        if item is None:
+            break
+        if item['index'] % report_every == 0:
+            print(f"[{name}] frame {item['index']}: {len(item['detections'].xyxy)} objects, "
+                  f"{item['latency_ms']:.1f} ms capture-to-result")
+
+async def serve(model, sources, **kwargs):
+    server = InferenceServer(model, sources, **kwargs)
+    consumers = [asyncio.create_task(print_results(server, name)) for name in sources]
+    summary = await server.run()
+    await asyncio.gather(*consumers)
+    return summary
+
+if __name__ == "__main__":
+    from model_backends import load_model
+
+    # Parameters
+    weights = "/home/zohaib/pytorch3d-renderer/open3d/yolo_training/experiment14/weights/best.pt"
+    backend = 'torch'
+    # Stream name -> device index, video file or stream URL
+    sources = {'shelf_1': 0, 'shelf_2': 'recordings/shelf_2.mp4'}
+
+    summary = asyncio.run(serve(load_model(weights, backend), sources, max_batch=len(sources)))
+    print(f"Served {summary['frames']} frames at {summary['fps']:.1f} FPS, mean batch {summary['mean_batch']:.1f}, "
+          f"{summary['infer_ms_per_frame']:.1f} ms inference per frame; dropped {summary['dropped']}")
+    if summary['failed']:
+        print(f"Failed streams: {summary['failed']}")
@@ -1,56 +1,108 @@
-from ultralytics import YOLO
 import cv2
 import numpy as np
+from live_pipeline import run_live, yolo_detector
+from motion_gate import gated_detector
+from model_backends import load_model
+from latency_budget import budgeted_detector
+from frame_ring import run_ring_live
+
+# Run capture, inference and display on separate threads, always on the newest frame
+pipelined = True
+# Only run the detector every detect_every frames or when the scene changes; in between, boxes are extrapolated
+# at constant velocity (not by the tracker's Kalman filter), so keep this off unless the scene is near static
+motion_gated = False
+detect_every = 5
+motion_threshold = 0.02  # Fraction of (downscaled) pixels that must change to force a detection
+# Target inference time per frame in ms; imgsz/conf/max_det are stepped down when it is exceeded (None = fixed)
+latency_budget_ms = None
+# Capture in a separate process that hands frames over through shared memory (pipelined mode only)
+shared_memory_capture = False
 
 # Load the YOLOv8 model (you can replace this with your custom YOLO model)
-model = YOLO("/home/zohaib/pytorch3d-renderer/open3d/yolo_training/experiment14/weights/best.pt")  # Path to your trained model
+weights = "/home/zohaib/pytorch3d-renderer/open3d/yolo_training/experiment14/weights/best.pt"  # Path to your trained model
+backend = 'torch'  # 'torch', 'onnx', 'openvino' or 'openvino-int8'; exports are made by export_benchmark.py
+
+if __name__ == "__main__":
+    model = load_model(weights, backend)
+
+    def build_detector(rgb=False):
+        budget_stats = {}
+        if latency_budget_ms:
+            detect = budgeted_detector(model, latency_budget_ms, rgb=rgb, stats=budget_stats)
+        else:
+            detect = yolo_detector(model, conf=0.5, rgb=rgb)
+        gate_stats = {}
+        if motion_gated:
+            detect = gated_detector(detect, every=detect_every, threshold=motion_threshold, stats=gate_stats)
+        return detect, gate_stats, budget_stats
+
+    def print_detector_stats(gate_stats, budget_stats):
+        if gate_stats:
+            print(f"Detector ran on {gate_stats['detected']} frames, boxes propagated on {gate_stats['propagated']}")
+        if budget_stats:
+            print(f"Final imgsz {budget_stats['imgsz']} at {budget_stats['ewma_ms']:.1f} ms per inference")
+
+    if pipelined and shared_memory_capture:
+        # Frames are converted to RGB in place in shared memory, so the detector gets them ready to use
+        detect, gate_stats, budget_stats = build_detector(rgb=True)
+        run_ring_live(0, detect, model.names)
+        print_detector_stats(gate_stats, budget_stats)
+        exit()
+
+    # Set webcam stream
+    cap = cv2.VideoCapture(0)  # Use 0 for the default webcam
 
-# Set webcam stream
-cap = cv2.VideoCapture(0)  # Use 0 for the default webcam
+    if not cap.isOpened():
+        print("Error: Could not open webcam.")
+        exit()
 
-if not cap.isOpened():
-    print("Error: Could not open webcam.")
-    exit()
+    if pipelined:
+        # Keep only the newest frame in the driver's buffer where the backend allows it
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        detect, gate_stats, budget_stats = build_detector()
+        summary = run_live(cap, detect, model.names)
+        print_detector_stats(gate_stats, budget_stats)
+        print(f"Glass-to-box latency p50 {summary['glass_to_box']['p50_ms']:.1f} ms, {summary['fps']:.1f} FPS")
 
-while True:
-    ret, frame = cap.read()  # Capture frame-by-frame
-    if not ret:
-        print("Error: Could not read frame.")
-        break
+    while not pipelined:
+        ret, frame = cap.read()  # Capture frame-by-frame
+        if not ret:
+            print("Error: Could not read frame.")
+            break
 
-    # Convert the frame to RGB (YOLO expects this)
-    img_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        # Convert the frame to RGB (YOLO expects this)
+        img_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
 
-    # Perform inference with YOLOv8
-    results = model.track(img_rgb, conf=0.5)
+        # Perform inference with YOLOv8
+        results = model.track(img_rgb, conf=0.5)
 
-    # Get the detection results
-    detected_results = results[0].boxes  # Get detected boxes from the first image (as this is real-time video)
+        # Get the detection results
+        detected_results = results[0].boxes  # Get detected boxes from the first image (as this is real-time video)
 
-    # Loop through the detected results and draw bounding boxes
-    for box in detected_results:
-        # Get coordinates and class info
-        xmin, ymin, xmax, ymax = map(int, box.xyxy[0])  # Bounding box coordinates
-        confidence = box.conf[0].item()  # Confidence score
-        class_id = int(box.cls[0])  # Class ID
+        # Loop through the detected results and draw bounding boxes
+        for box in detected_results:
+            # Get coordinates and class info
+            xmin, ymin, xmax, ymax = map(int, box.xyxy[0])  # Bounding box coordinates
+            confidence = box.conf[0].item()  # Confidence score
+            class_id = int(box.cls[0])  # Class ID
 
-        # Draw the bounding box
-        cv2.rectangle(frame, (xmin, ymin), (xmax, ymax), (0, 255, 0), 2)
+            # Draw the bounding box
+            cv2.rectangle(frame, (xmin, ymin), (xmax, ymax), (0, 255, 0), 2)
 
-        # Get the label for the detected object
-        label = f"{model.names[class_id]}: {confidence:.2f}"
+            # Get the label for the detected object
+            label = f"{model.names[class_id]}: {confidence:.2f}"
         
-        # Put the label above the bounding box
-        cv2.putText(frame, label, (xmin, ymin - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.9, (0, 255, 0), 2)
+            # Put the label above the bounding box
+            cv2.putText(frame, label, (xmin, ymin - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.9, (0, 255, 0), 2)
 
-    # Display the result frame with bounding boxes
-    cv2.imshow('YOLO Webcam Inference', frame)
+        # Display the result frame with bounding boxes
+        cv2.imshow('YOLO Webcam Inference', frame)
 
-    # Press 'q' to quit
-    if cv2.waitKey(1) & 0xFF == ord('q'):
-        break
+        # Press 'q' to quit
+        if cv2.waitKey(1) & 0xFF == ord('q'):
+            break
 
-# When everything is done, release the capture and close the windows
-cap.release()
-cv2.destroyAllWindows()
+    # When everything is done, release the capture and close the windows
+    cap.release()
+    cv2.destroyAllWindows()
 
@@ -0,0 +1,82 @@
+import cv2
+import time
+from detections import detections_from_result
+
+# Cheapest first. Smaller rungs also raise conf and lower max_det, which
+# shortens NMS when the box is already struggling.
+DEFAULT_LADDER = (
+    {'imgsz': 256, 'conf': 0.6, 'max_det': 50},
+    {'imgsz': 320, 'conf': 0.55, 'max_det': 100},
+    {'imgsz': 416, 'conf': 0.5, 'max_det': 300},
+    {'imgsz': 512, 'conf': 0.5, 'max_det': 300},
+    {'imgsz': 640, 'conf': 0.5, 'max_det': 300},
+)
+
+class ResolutionController:
+    """Keeps inference latency inside a frame-time budget by moving along a ladder of settings.
+
+    An EWMA of measured latency is compared with target_ms after every
+    frame. Above the budget it steps one rung down; it steps up only when
+    the next rung's latency, predicted from the pixel count ratio, would
+    still fit under headroom * target_ms. After every step it waits
+    cooldown frames so the EWMA can settle on the new rung.
+    """
+
+    def __init__(self, target_ms, ladder=DEFAULT_LADDER, start=None, alpha=0.2, headroom=0.85, cooldown=15):
+        self.target_ms = target_ms
+        self.ladder = ladder
+        self.rung = len(ladder) - 1 if start is None else start
+        self.alpha = alpha
+        self.headroom = headroom
+        self.cooldown = cooldown
+        self.ewma_ms = None
+        self.frames_on_rung = 0
+
+    @property
+    def settings(self):
+        return self.ladder[self.rung]
+
+    def _scale(self, rung):
+        return (self.ladder[rung]['imgsz'] / self.settings['imgsz']) ** 2
+
+    def _step(self, rung):
+        # Carry the estimate over to the new rung instead of starting from scratch
+        self.ewma_ms *= self._scale(rung)
+        self.rung = rung
+        self.frames_on_rung = 0
+
+    def update(self, latency_ms):
+        """Record one inference latency and return the settings for the next frame."""
+        self.ewma_ms = latency_ms if self.ewma_ms is None else self.alpha * latency_ms + (1 - self.alpha) * self.ewma_ms
+        self.frames_on_rung += 1
+        if self.frames_on_rung < self.cooldown:
+            return self.settings
+
+        if self.ewma_ms > self.target_ms and self.rung > 0:
+            self._step(self.rung - 1)
+        elif self.rung < len(self.ladder) - 1 and self.ewma_ms * self._scale(self.rung + 1) < self.headroom * self.target_ms:
+            self._step(self.rung + 1)
+        return self.settings
+
+def budgeted_detector(model, target_ms, ladder=DEFAULT_LADDER, rgb=False, stats=None):
+    """Like live_pipeline.yolo_detector, with imgsz, conf and max_det chosen by a ResolutionController.
+
+    Only models that accept any input size adapt (PyTorch weights, or
+    exports made with dynamic shapes); static exports letterbox to their
+    fixed size whatever the rung. rgb is as for yolo_detector. stats, if
+    given, is a dict that always holds the current settings and latency EWMA.
+    """
+    controller = ResolutionController(target_ms, ladder)
+
+    def detect(frame):
+        settings = controller.settings
+        # Convert the frame to RGB (YOLO expects this)
+        img_rgb = frame if rgb else cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        start = time.perf_counter()
+        results = model.track(img_rgb, persist=True, verbose=False, **settings)
+        controller.update((time.perf_counter() - start) * 1000)
+        if stats is not None:
+            stats.update(controller.settings, ewma_ms=controller.ewma_ms)
+        return detections_from_result(results[0])
+
+    return detect
@@ -0,0 +1,187 @@
+import cv2
+import threading
+import time
+import numpy as np
+import telemetry
+from collections import deque
+from detections import detections_from_result, draw_detections
+
+class LatestSlot:
+    """Single-item hand-off between two threads where the newest item wins.
+
+    put never blocks: an item the consumer has not taken yet is replaced and
+    counted as dropped. get blocks until there is an item, and returns None
+    once the slot is closed and empty.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._item = None
+        self._closed = False
+        self.dropped = 0
+
+    def put(self, item):
+        with self._cond:
+            if self._item is not None:
+                self.dropped += 1
+            self._item = item
+            self._cond.notify()
+
+    def get(self, timeout=None):
+        with self._cond:
+            deadline = None if timeout is None else time.monotonic() + timeout
+            while self._item is None and not self._closed:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return None
+                self._cond.wait(remaining)
+            item, self._item = self._item, None
+            return item
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    @property
+    def closed(self):
+        with self._cond:
+            return self._closed and self._item is None
+
+class LatencyStats:
+    """Rolling window of latency samples in seconds, summarized in milliseconds."""
+
+    def __init__(self, window=300):
+        self.samples = deque(maxlen=window)
+        self.lock = threading.Lock()
+
+    def add(self, seconds):
+        with self.lock:
+            self.samples.append(seconds)
+
+    def summary(self):
+        with self.lock:
+            samples = np.array(self.samples) * 1000
+        if not len(samples):
+            return {'mean_ms': 0.0, 'p50_ms': 0.0, 'p95_ms': 0.0}
+        return {'mean_ms': float(samples.mean()), 'p50_ms': float(np.percentile(samples, 50)),
+                'p95_ms': float(np.percentile(samples, 95))}
+
+def yolo_detector(model, conf=0.5, rgb=False):
+    """Detection function for the pipeline: BGR frame -> detections.Detections.
+
+    Tracks persist between calls, so track ids stay stable across frames.
+    With rgb=True the frames are taken to be converted to RGB already.
+    """
+    def detect(frame):
+        # Convert the frame to RGB (YOLO expects this)
+        img_rgb = frame if rgb else cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        results = model.track(img_rgb, conf=conf, persist=True, verbose=False)
+        return detections_from_result(results[0])
+    return detect
+
+def capture_loop(cap, slot, stop, stats):
+    """Read frames as fast as the camera delivers them, so its buffer never fills with stale frames."""
+    index = 0
+    try:
+        while not stop.is_set():
+            start = time.perf_counter()
+            ret, frame = cap.read()
+            if not ret:
+                print("Error: Could not read frame.")
+                break
+            stats['capture'].add(time.perf_counter() - start)
+            telemetry.observe('stage_seconds', time.perf_counter() - start, stage='capture')
+            telemetry.count('frames_captured')
+            slot.put({'index': index, 'captured': time.perf_counter(), 'frame': frame, 'detections': None})
+            index += 1
+    finally:
+        slot.close()
+
+def infer_loop(detect, in_slot, out_slot, stop, stats):
+    """Run detect on the freshest captured frame whenever the previous inference finishes."""
+    try:
+        while not stop.is_set():
+            item = in_slot.get()
+            if item is None:
+                break
+            start = time.perf_counter()
+            item['detections'] = detect(item['frame'])
+            stats['infer'].add(time.perf_counter() - start)
+            telemetry.observe('stage_seconds', time.perf_counter() - start, stage='infer')
+            out_slot.put(item)
+    finally:
+        out_slot.close()
+
+def format_report(stats, fps, dropped_captured, dropped_inferred):
+    parts = [f"{name} {stats[name].summary()['mean_ms']:.1f} ms" for name in ('capture', 'infer', 'present')]
+    glass_to_box = stats['glass_to_box'].summary()
+    parts.append(f"glass-to-box {glass_to_box['p50_ms']:.1f} ms (p95 {glass_to_box['p95_ms']:.1f})")
+    parts.append(f"{fps:.1f} FPS")
+    parts.append(f"dropped {dropped_captured} captured / {dropped_inferred} inferred")
+    return " | ".join(parts)
+
+def run_live(cap, detect, names, window_name='YOLO Webcam Inference', show=True, report_every=2.0):
+    """Pipelined live inference: capture, inference and presentation each run on their own thread.
+
+    The stages are linked by LatestSlots, so a slow stage makes the faster
+    ones skip frames instead of queueing them, and every inference runs on
+    the newest frame the camera produced. Presentation stays on the calling
+    thread because OpenCV windows must be driven from it. Per-stage latency,
+    capture-to-display latency and displayed FPS are printed every
+    report_every seconds; the final summary is returned. Press 'q' to quit.
+    """
+    stats = {name: LatencyStats() for name in ('capture', 'infer', 'present', 'glass_to_box')}
+    captured, inferred = LatestSlot(), LatestSlot()
+    stop = threading.Event()
+    threads = [threading.Thread(target=capture_loop, args=(cap, captured, stop, stats), daemon=True),
+               threading.Thread(target=infer_loop, args=(detect, captured, inferred, stop, stats), daemon=True)]
+    for thread in threads:
+        thread.start()
+
+    shown = 0
+    start_time = last_report = time.perf_counter()
+    window_shown, window_start = 0, start_time
+    fps = 0.0
+    try:
+        while not inferred.closed:
+            item = inferred.get(timeout=0.1)
+            if item is not None:
+                start = time.perf_counter()
+                frame = draw_detections(item['frame'], item['detections'], names)
+                if show:
+                    cv2.imshow(window_name, frame)
+                now = time.perf_counter()
+                stats['present'].add(now - start)
+                stats['glass_to_box'].add(now - item['captured'])
+                telemetry.observe('stage_seconds', now - start, stage='draw')
+                telemetry.observe('glass_to_box_seconds', now - item['captured'])
+                telemetry.count('frames_shown')
+                shown += 1
+                window_shown += 1
+
+            # Press 'q' to quit
+            if show and cv2.waitKey(1) & 0xFF == ord('q'):
+                break
+
+            now = time.perf_counter()
+            if now - last_report >= report_every:
+                fps = window_shown / (now - window_start)
+                window_shown, window_start = 0, now
+                print(format_report(stats, fps, captured.dropped, inferred.dropped))
+                last_report = now
+    finally:
+        stop.set()
+        captured.close()
+        for thread in threads:
+            thread.join(timeout=1.0)
+        telemetry.count('frames_dropped', captured.dropped, stage='capture')
+        telemetry.count('frames_dropped', inferred.dropped, stage='infer')
+        if show:
+            cv2.destroyAllWindows()
+
+    elapsed = time.perf_counter() - start_time
+    summary = {name: stats[name].summary() for name in stats}
+    summary['fps'] = shown / elapsed if elapsed > 0 else 0.0
+    summary['dropped'] = {'captured': captured.dropped, 'inferred': inferred.dropped}
+    return summary
@@ -2,7 +2,11 @@ import open3d as o3d
 import numpy as np
 import os
 import cv2
-import glob
+from mesh_cache import load_triangle_mesh
+from poses import make_pose_table
+from render_backends import create_backend
+from image_io import image_format, list_images, training_render_size
+from streaming import render_to_disk
 
 def adjust_to_upright(mesh):
     # Rotate the mesh to align Z-up (Peel3D) to Y-up (Open3D)
@@ -20,32 +24,38 @@ def manual_adjustment(mesh):
     vis.run()
     vis.destroy_window()
 
-def capture_images(mesh, output_dir, num_images, angle_step):
-    # Create a visualizer for capturing images
-    vis = o3d.visualization.Visualizer()
-    vis.create_window(visible=False)
-    vis.add_geometry(mesh)
-
-    for i in range(num_images):
-        current_angle = i * angle_step
-        rotation_matrix = mesh.get_rotation_matrix_from_xyz(np.radians([np.random.uniform(-6, 6), current_angle, 0]))
-        mesh.rotate(rotation_matrix)
-        
-        vis.update_geometry(mesh)
-        vis.poll_events()
-        vis.update_renderer()
-        image_path = os.path.join(output_dir, f"image{i+1:03d}.png")
-        vis.capture_screen_image(image_path)
+def capture_images(mesh, output_dir, poses, annotation_dir=None, class_id=0,
+                   image_width=1920, image_height=1080, label_source='projection', seg_dir=None,
+                   backend='visualizer', visualization_dir=None, output_format=None, letterbox_size=None):
+    # poses is an (N, 3, 3) array of absolute object rotations, e.g. a poses.make_pose_table column
+    num_images = len(poses)
+
+    # Render straight at the training resolution and pad to YOLO's square letterbox
+    if letterbox_size:
+        image_width, image_height = training_render_size(image_width, image_height, letterbox_size)
+
+    # Create the renderer ('visualizer' hidden window or headless 'offscreen')
+    with_depth = label_source == 'depth' or seg_dir is not None
+    renderer = create_backend(backend, mesh, image_width, image_height, with_depth)
+    vertices = np.asarray(mesh.vertices).copy()
+
+    # Frames stay in memory from render to label to overlay; a writer thread
+    # pool does the encoding and the only disk write per output
+    names = [f"image{i+1:03d}" for i in range(num_images)]
+    saved = render_to_disk(renderer, poses, names, vertices, output_dir, class_id, annotation_dir, seg_dir,
+                           visualization_dir, label_source, image_format=output_format,
+                           letterbox_size=letterbox_size)
+    for i, image_path in enumerate(saved):
         print(f"{i+1}/{num_images} image saved...")
 
-    vis.destroy_window()
+    renderer.close()
     print(f"All {num_images} images saved in {output_dir}.")
 
 def annotate_images(image_dir, annotation_dir, visualization_dir, image_width, image_height):
     os.makedirs(annotation_dir, exist_ok=True)
     os.makedirs(visualization_dir, exist_ok=True)
 
-    image_files = glob.glob(f"{image_dir}/*.png")
+    image_files = list_images(image_dir)
 
     for image_file in image_files:
         print(f"Processing {image_file}")
@@ -71,7 +81,7 @@ def annotate_images(image_dir, annotation_dir, visualization_dir, image_width, i
 
         # Write the maximum bounding box to YOLO annotation file
         if max_bbox:
-            annotation_file = os.path.join(annotation_dir, os.path.basename(image_file).replace('.png', '.txt'))
+            annotation_file = os.path.join(annotation_dir, os.path.splitext(os.path.basename(image_file))[0] + '.txt')
             x, y, w, h = max_bbox
             center_x = (x + w / 2) / image_width
             center_y = (y + h / 2) / image_height
@@ -95,23 +105,39 @@ obj_file_path = '/home/zohaib/pytorch3d-renderer/peel_3d_objects/Scan Models/Spr
 image_output_dir = "smooth_motion_images"
 output_annotation_dir = "yolo_annotations"
 output_visualization_dir = "annotated_images"
+output_segmentation_dir = None  # e.g. "yolo_seg_annotations" for yolov8n-seg polygons
 num_images = 150
 image_width = 1920
 image_height = 1080
+label_at_render = True  # Label at render time instead of Canny on the saved PNGs
+label_source = 'projection'  # 'projection' (mesh vertices) or 'depth' (depth-buffer mask)
+render_backend = 'visualizer'  # 'visualizer' (hidden window) or 'offscreen' (headless, no display needed)
+pose_sampler = 'turntable'  # 'turntable', 'fibonacci', 'stratified' or 'bands' (see poses.py)
+pose_seed = 0
+output_format = image_format('png')  # e.g. image_format('jpeg', 90), image_format('png-fast') or image_format('webp')
+train_imgsz = None  # e.g. 640 (model.py's imgsz) to render at that size, letterboxed, instead of image_width x image_height
 
 # Ensure output directories exist
 os.makedirs(image_output_dir, exist_ok=True)
 
-# Load and adjust the mesh
-mesh = o3d.io.read_triangle_mesh(obj_file_path, True)
-mesh.compute_vertex_normals()
+# Load and adjust the mesh (parsed once, then memory-mapped from .mesh_cache/)
+mesh = load_triangle_mesh(obj_file_path)
 mesh = adjust_to_upright(mesh)
 manual_adjustment(mesh)
 
 # Capture images of the mesh
-angle_step = 360 / num_images
-capture_images(mesh, image_output_dir, num_images, angle_step)
-
-# Annotate images with bounding boxes
-annotate_images(image_output_dir, output_annotation_dir, output_visualization_dir, image_width, image_height)
+poses = make_pose_table(pose_sampler, num_images, seed=pose_seed)['rotation']
+if label_at_render:
+    capture_images(mesh, image_output_dir, poses, annotation_dir=output_annotation_dir,
+                   image_width=image_width, image_height=image_height,
+                   label_source=label_source, seg_dir=output_segmentation_dir, backend=render_backend,
+                   visualization_dir=output_visualization_dir, output_format=output_format,
+                   letterbox_size=train_imgsz)
+else:
+    capture_images(mesh, image_output_dir, poses, backend=render_backend, output_format=output_format,
+                   letterbox_size=train_imgsz)
+
+    # Annotate images with bounding boxes
+    annotate_images(image_output_dir, output_annotation_dir, output_visualization_dir,
+                    train_imgsz or image_width, train_imgsz or image_height)
 
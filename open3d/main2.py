@@ -2,29 +2,18 @@ import numpy as np
 import matplotlib.pyplot as plt
 from mpl_toolkits.mplot3d.art3d import Poly3DCollection
 import os
+from mesh_slicing import slice_faces
+import telemetry
+import mesh_cache
 
 def load_obj(file_path):
-    vertices = []
-    faces = []
-    with open(file_path, 'r') as file:
-        for line in file:
-            if line.startswith('v '):
-                vertices.append([float(x) for x in line.split()[1:4]])
-            elif line.startswith('f '):
-                faces.append([int(x.split('/')[0]) - 1 for x in line.split()[1:4]])
-    return np.array(vertices), np.array(faces)
+    # Bulk-parsed (n-gons triangulated) and cached by content hash
+    arrays, _ = mesh_cache.load_obj(file_path)
+    return np.asarray(arrays['vertices']), np.asarray(arrays['faces'])
 
 def slice_mesh(vertices, faces, plane_origin, plane_normal):
-    # Calculate signed distances from vertices to the plane
-    distances = np.dot(vertices - plane_origin, plane_normal)
-    
-    # Find faces that intersect the plane
-    intersecting_faces = []
-    for face in faces:
-        if np.min(distances[face]) * np.max(distances[face]) <= 0:
-            intersecting_faces.append(face)
-    
-    return np.array(intersecting_faces)
+    # Faces that intersect the plane, found with array ops over all faces
+    return faces[slice_faces(vertices, faces, plane_origin, plane_normal)[0]]
 
 def main():
     obj_file_path = "/home/zohaib/pytorch3d-renderer/peel_3d_objects/pringles/pringles.obj"
@@ -34,6 +23,7 @@ def main():
     os.makedirs(output_dir, exist_ok=True)
 
     num_images = 120
+    rotations, zoom_factors, plane_normals = [], [], []
     for i in range(num_images):
         # Random rotation
         angles = np.random.uniform(0, 360, size=3)
@@ -46,18 +36,26 @@ def main():
         Rz = np.array([[np.cos(np.radians(angles[2])), -np.sin(np.radians(angles[2])), 0],
                        [np.sin(np.radians(angles[2])), np.cos(np.radians(angles[2])), 0],
                        [0, 0, 1]])
-        R = np.dot(Rz, np.dot(Ry, Rx))
-        rotated_vertices = np.dot(vertices, R.T)
+        rotations.append(np.dot(Rz, np.dot(Ry, Rx)))
 
         # Random zoom
-        zoom_factor = np.random.uniform(0.3, 2.0)
-        zoomed_vertices = rotated_vertices * zoom_factor
+        zoom_factors.append(np.random.uniform(0.3, 2.0))
 
         # Random slice
-        plane_origin = np.mean(zoomed_vertices, axis=0)
         plane_normal = np.random.rand(3)
-        plane_normal /= np.linalg.norm(plane_normal)
-        sliced_faces = slice_mesh(zoomed_vertices, faces, plane_origin, plane_normal)
+        plane_normals.append(plane_normal / np.linalg.norm(plane_normal))
+
+    # Rotating and zooming the mesh does not change which faces a plane through
+    # its mean cuts, so all planes are mapped back to the original mesh frame
+    # (normal R^T n) and sliced in one batch.
+    object_normals = np.einsum('pji,pj->pi', np.array(rotations), np.array(plane_normals))
+    with telemetry.timer('slice'):
+        sliced_face_indices = slice_faces(vertices, faces, np.mean(vertices, axis=0), object_normals)
+
+    for i in range(num_images):
+        R = rotations[i]
+        zoomed_vertices = np.dot(vertices, R.T) * zoom_factors[i]
+        sliced_faces = faces[sliced_face_indices[i]]
 
         # Visualization
         fig = plt.figure()
@@ -73,8 +71,10 @@ def main():
 
         # Save image
         image_path = os.path.join(output_dir, f"slice_{i}.png")
-        plt.savefig(image_path)
+        with telemetry.timer('encode'):
+            plt.savefig(image_path)
         plt.close()
+        telemetry.count('images_written')
 
         print(f"Slice {i} is done...")
 
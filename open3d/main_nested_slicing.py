@@ -1,7 +1,16 @@
 import open3d as o3d
 import numpy as np
 import os
-import random
+import zlib
+import multiprocessing as mp
+from functools import partial
+import telemetry
+from mesh_cache import load_triangle_mesh
+from poses import make_pose_table
+from render_backends import create_backend
+from image_io import image_format, training_render_size
+from streaming import render_to_disk
+from yolo_labels import get_class_mapping, get_class_id, mesh_class_name
 
 def adjust_to_upright(mesh):
     # Rotate the mesh to align Z-up (Peel3D) to Y-up (Open3D)
@@ -23,8 +32,99 @@ def manual_adjustment(mesh):
     vis.run()
     vis.destroy_window()
 
-def process_meshes_in_directory(root_dir):
-    """Process all .obj files in the directory and its subdirectories."""
+def find_obj_files(root_dir):
+    """Return every .obj file under root_dir in a stable (sorted) order."""
+    obj_files = []
+    for subdir, _, files in os.walk(root_dir):
+        for file in files:
+            if file.lower().endswith('.obj'):
+                obj_files.append(os.path.join(subdir, file))
+    return sorted(obj_files)
+
+def load_upright_mesh(obj_file_path):
+    """Load a mesh with textures and normals (through the mesh cache) and rotate it upright."""
+    mesh = load_triangle_mesh(obj_file_path)
+    return adjust_to_upright(mesh)
+
+def mesh_poses(base_filename, num_images, pose_sampler='turntable'):
+    """Pose table for one mesh, seeded by the mesh name.
+
+    Every worker rendering a shard of the same mesh builds the same table and
+    renders its own slice of it.
+    """
+    return make_pose_table(pose_sampler, num_images, seed=zlib.crc32(base_filename.encode()))['rotation']
+
+def render_mesh_frames(mesh, base_filename, output_dir, num_images, start=0, stop=None, verbose=True,
+                       class_id=-1, label_dir=None, seg_dir=None, label_source='projection',
+                       image_width=1920, image_height=1080, backend='visualizer', pose_sampler='turntable',
+                       output_format=None, letterbox_size=None):
+    """Render frames [start, stop) of one mesh into output_dir as <base>_<i>.png (or output_format's extension).
+
+    When class_id is known, a YOLO label is written to label_dir and a YOLO
+    segmentation label to seg_dir for each frame (see yolo_labels.frame_labels
+    for label_source). backend is a render_backends name and pose_sampler a
+    poses.SAMPLERS name. With letterbox_size, frames are rendered at the
+    largest size that fits that square and letterboxed to it.
+    """
+    stop = num_images if stop is None else stop
+    if letterbox_size:
+        image_width, image_height = training_render_size(image_width, image_height, letterbox_size)
+    poses = mesh_poses(base_filename, num_images, pose_sampler)
+
+    write_labels = (label_dir is not None or seg_dir is not None) and class_id != -1
+    with_depth = write_labels and (label_source == 'depth' or seg_dir is not None)
+    renderer = create_backend(backend, mesh, image_width, image_height, with_depth)
+    vertices = np.asarray(mesh.vertices).copy()
+
+    # Render -> label -> encode/write as one stream; encoding happens on a writer thread pool
+    names = [f"{base_filename}_{i+1:02d}" for i in range(start, stop)]
+    saved = render_to_disk(renderer, poses[start:stop], names, vertices, output_dir, class_id, label_dir, seg_dir,
+                           label_source=label_source, image_format=output_format, letterbox_size=letterbox_size)
+    for i, image_path in enumerate(saved, start):
+        if verbose:
+            print(f"{i+1:02d}/{num_images} image saved... {image_path}")
+
+    # Clean up
+    renderer.close()
+    return stop - start
+
+def render_shard(render_options, shard):
+    """Worker entry point: render one (mesh, frame range) shard."""
+    obj_file_path, class_id, num_images, start, stop = shard
+    base_filename = os.path.splitext(os.path.basename(obj_file_path))[0]
+    mesh = load_upright_mesh(obj_file_path)
+    saved = render_mesh_frames(mesh, base_filename, num_images=num_images, start=start, stop=stop, verbose=False,
+                               class_id=class_id, **render_options)
+    return obj_file_path, start, stop, saved
+
+def make_shards(obj_files, class_ids, num_images, frames_per_shard=None):
+    """Split every mesh into (mesh, frame range) shards of at most frames_per_shard frames."""
+    frames_per_shard = frames_per_shard or num_images
+    shards = []
+    for obj_file_path, class_id in zip(obj_files, class_ids):
+        for start in range(0, num_images, frames_per_shard):
+            shards.append((obj_file_path, class_id, num_images, start, min(start + frames_per_shard, num_images)))
+    return shards
+
+def process_meshes_in_directory(root_dir, num_images=150, num_workers=1, frames_per_shard=None, label_at_render=True,
+                                label_source='projection', segmentation=False, backend='visualizer',
+                                pose_sampler='turntable', output_format=None, letterbox_size=None):
+    """Process all .obj files in the directory and its subdirectories.
+
+    With num_workers > 1 the meshes (or frames_per_shard sized slices of them)
+    are rendered by a pool of processes, each with its own hidden visualizer.
+    The interactive manual adjustment step is only run in serial mode.
+
+    With label_at_render, YOLO labels are written to ./train/labels/ as the
+    frames are rendered; the class is the subdirectory of root_dir the mesh
+    sits in, the same mapping the annotators use. With segmentation,
+    YOLO-seg polygons from the depth buffer also go to ./train/labels_seg/
+    from the same render. backend selects the renderer
+    ('visualizer' hidden window or headless 'offscreen') and pose_sampler the
+    view sampler (see poses.py). output_format is an image_io.ImageFormat
+    (lossless PNG by default). letterbox_size (e.g. model.py's imgsz)
+    renders at the training resolution, letterboxed to a square.
+    """
     # Resolve root directory to absolute path
     root_dir = os.path.abspath(root_dir)
 
@@ -33,57 +133,62 @@ def process_meshes_in_directory(root_dir):
     os.makedirs(output_dir, exist_ok=True)
     print(f"Output directory: {output_dir}")
 
-    for subdir, _, files in os.walk(root_dir):
-        for file in files:
-            if file.lower().endswith('.obj'):
-                obj_file_path = os.path.join(subdir, file)
-                print(f"Processing {obj_file_path}")
-
-                # Load the mesh
-                mesh = o3d.io.read_triangle_mesh(obj_file_path, True)
-                mesh.compute_vertex_normals()
-
-                # Adjust the mesh to an upright position
-                mesh = adjust_to_upright(mesh)
-
-                # Perform manual orientation adjustment
-                manual_adjustment(mesh)
-
-                # Parameters
-                num_images = 150  # Number of images to capture
-                angle_step = 360 / num_images  # Step size for rotation in degrees
-
-                # Create a visualizer for capturing images
-                vis = o3d.visualization.Visualizer()
-                vis.create_window(visible=False)
-                vis.add_geometry(mesh)
-
-                # Extract base filename without extension
-                base_filename = os.path.splitext(file)[0]
-
-                # Loop through each image
-                for i in range(num_images):
-                    # Apply the rotation incrementally for smooth continuous rotation
-                    current_angle = i * angle_step
-                    rotation_matrix = mesh.get_rotation_matrix_from_xyz(np.radians([random.uniform(-6, 6), current_angle, 0]))  # Rotate around y-axis
-                    mesh.rotate(rotation_matrix)
-
-                    # Update the visualization and save the image
-                    vis.update_geometry(mesh)
-                    vis.poll_events()
-                    vis.update_renderer()
-                    image_filename = f"{base_filename}_{i+1:02d}.png"
-                    image_path = os.path.join(output_dir, image_filename)
-                    vis.capture_screen_image(image_path)
-                    print(f"{i+1:02d}/{num_images} image saved... {image_path}")
-
-                # Clean up
-                vis.destroy_window()
-                print(f"All {num_images} images saved in {output_dir}.")
-
-# Example usage
-root_directory = 'models_'  # Update the directory if needed
-process_meshes_in_directory(root_directory)
+    render_options = {'output_dir': output_dir, 'label_dir': None, 'seg_dir': None, 'label_source': label_source,
+                      'backend': backend, 'pose_sampler': pose_sampler, 'output_format': output_format,
+                      'letterbox_size': letterbox_size}
+    if label_at_render:
+        render_options['label_dir'] = os.path.abspath('./train/labels/')
+        os.makedirs(render_options['label_dir'], exist_ok=True)
+        if segmentation:
+            render_options['seg_dir'] = os.path.abspath('./train/labels_seg/')
+            os.makedirs(render_options['seg_dir'], exist_ok=True)
+
+    obj_files = find_obj_files(root_dir)
+    class_mapping = get_class_mapping(root_dir)
+    class_ids = [get_class_id(mesh_class_name(f, root_dir), class_mapping) for f in obj_files]
+    if label_at_render:
+        for obj_file_path, class_id in zip(obj_files, class_ids):
+            if class_id == -1:
+                print(f"Warning: unknown class for {obj_file_path} (known: {sorted(class_mapping)}), "
+                      f"no labels will be written.")
+
+    if num_workers > 1:
+        shards = make_shards(obj_files, class_ids, num_images, frames_per_shard)
+        total = len(obj_files) * num_images
+        done = 0
+        print(f"Rendering {len(obj_files)} meshes in {len(shards)} shards with {num_workers} workers")
+        # Spawn fresh interpreters so each worker gets a clean OpenGL context
+        with mp.get_context("spawn").Pool(num_workers) as pool:
+            task = telemetry.collect(partial(render_shard, render_options))
+            for obj_file_path, start, stop, saved in map(telemetry.merged, pool.imap_unordered(task, shards)):
+                done += saved
+                print(f"{done}/{total} images saved... {os.path.basename(obj_file_path)} frames {start+1}-{stop}")
+        print(f"All {total} images saved in {output_dir}.")
+        return
+
+    for obj_file_path, class_id in zip(obj_files, class_ids):
+        print(f"Processing {obj_file_path}")
+
+        # Load the mesh and adjust it to an upright position
+        mesh = load_upright_mesh(obj_file_path)
+
+        # Perform manual orientation adjustment
+        manual_adjustment(mesh)
+
+        # Extract base filename without extension
+        base_filename = os.path.splitext(os.path.basename(obj_file_path))[0]
+        render_mesh_frames(mesh, base_filename, num_images=num_images, class_id=class_id, **render_options)
+        print(f"All {num_images} images saved in {output_dir}.")
+
+if __name__ == "__main__":
+    # Example usage
+    root_directory = 'models_'  # Update the directory if needed
+    num_workers = 1  # Set > 1 to render meshes in parallel (skips manual adjustment)
+    render_backend = 'visualizer'  # 'offscreen' renders headless, without a display or Xvfb
+    output_format = image_format('png')  # e.g. image_format('jpeg', 90) when lossless storage is not needed
+    train_imgsz = None  # e.g. 640 to render letterboxed at model.py's imgsz instead of 1920x1080
+    process_meshes_in_directory(root_directory, num_workers=num_workers, backend=render_backend,
+                                output_format=output_format, letterbox_size=train_imgsz)
 
 
 
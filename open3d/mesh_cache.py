@@ -0,0 +1,216 @@
+import hashlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import numpy as np
+import telemetry
+
+DEFAULT_CACHE_DIR = '.mesh_cache'
+# 2: relative face indices resolve against the elements defined before their face line
+CACHE_VERSION = 2
+ARRAY_NAMES = ('vertices', 'faces', 'uvs', 'face_uvs', 'normals')
+
+def file_digest(file_path, cache_dir=DEFAULT_CACHE_DIR):
+    """SHA-1 of a file's contents.
+
+    Digests are remembered in <cache_dir>/digests.json by path, size and
+    mtime, so an unchanged file is not re-hashed on the next run.
+    """
+    file_path = os.path.abspath(file_path)
+    stat = os.stat(file_path)
+    index_path = os.path.join(cache_dir, 'digests.json')
+    try:
+        with open(index_path) as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        index = {}
+
+    entry = index.get(file_path)
+    if entry and entry[0] == stat.st_size and entry[1] == stat.st_mtime_ns:
+        return entry[2]
+
+    sha1 = hashlib.sha1()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            sha1.update(chunk)
+    digest = sha1.hexdigest()
+
+    index[file_path] = [stat.st_size, stat.st_mtime_ns, digest]
+    os.makedirs(cache_dir, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix='.json')
+    with os.fdopen(fd, 'w') as f:
+        json.dump(index, f)
+    os.replace(tmp_path, index_path)
+    return digest
+
+def _load_columns(lines, usecols, dtype):
+    """Parse whitespace separated rows in bulk with NumPy's C reader."""
+    if not lines:
+        return np.zeros((0, len(usecols)), dtype=dtype)
+    return np.loadtxt(io.BytesIO(b'\n'.join(lines)), usecols=usecols, dtype=dtype, ndmin=2)
+
+def _resolve_indices(indices, defined, count, file_path, kind):
+    """OBJ indices are 1-based; negative ones count back from the defined elements before their face line.
+
+    defined holds, per index, how many elements were defined before its
+    face line. Indices outside the count elements raise ValueError.
+    """
+    resolved = np.where(indices < 0, defined + indices, indices - 1)
+    if len(resolved) and (resolved.min() < 0 or resolved.max() >= count):
+        raise ValueError(f"{file_path}: {kind} index out of range (only {count} defined)")
+    return resolved
+
+def _parse_corners(face_lines, file_path):
+    """(C, 3) v, vt, vn indices of every face corner (0 where missing) and the corner count of every face line.
+
+    v, v/vt, v//vn and v/vt/vn corners may be mixed freely; the whole face
+    block is tokenized and converted with NumPy, not corner by corner.
+    """
+    if not face_lines:
+        return np.zeros((0, 3), dtype=np.int64), np.zeros(0, dtype=np.int64)
+    text = b'\n'.join(face_lines).replace(b'//', b'/0/') + b'\n'
+    data = np.frombuffer(text, dtype=np.uint8)
+    blank = np.isin(data, np.frombuffer(b' \t\r\n', dtype=np.uint8))
+    starts = np.flatnonzero(~blank & np.concatenate([[True], blank[:-1]]))
+    ends = np.flatnonzero(~blank & np.concatenate([blank[1:], [True]])) + 1
+    slashes = np.concatenate([[0], np.cumsum(data == ord('/'))])
+    fields = slashes[ends] - slashes[starts] + 1
+    if len(fields) and fields.max() > 3:
+        raise ValueError(f"{file_path}: face corner with more than three indices")
+    line_of = np.cumsum(data == ord('\n'))[starts]
+    counts = np.bincount(line_of, minlength=len(face_lines))
+
+    numbers = np.array(text.replace(b'/', b' ').split(), dtype=np.int64)
+    first = np.cumsum(fields) - fields
+    corners = np.zeros((len(fields), 3), dtype=np.int64)
+    for j in range(3):
+        present = fields > j
+        corners[present, j] = numbers[first[present] + j]
+    return corners, counts
+
+def _triangulate(counts):
+    """Corner indices (T, 3) fanning every polygon of counts[i] corners."""
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    num_triangles = np.maximum(counts - 2, 0)
+    first = np.repeat(starts, num_triangles)
+    offsets = np.arange(num_triangles.sum()) - np.repeat(np.cumsum(num_triangles) - num_triangles, num_triangles)
+    return np.stack([first, first + offsets + 1, first + offsets + 2], axis=1)
+
+def vertex_normals(vertices, faces):
+    """Area-weighted, normalized vertex normals."""
+    triangles = vertices[faces]
+    face_normals = np.cross(triangles[:, 1] - triangles[:, 0], triangles[:, 2] - triangles[:, 0])
+    normals = np.stack([np.bincount(faces.ravel(), np.repeat(face_normals[:, axis], 3), minlength=len(vertices))
+                        for axis in range(3)], axis=1)
+    lengths = np.linalg.norm(normals, axis=1, keepdims=True)
+    return normals / np.where(lengths > 0, lengths, 1)
+
+def _texture_path(file_path, mtllib_lines):
+    """Path of the first map_Kd texture referenced by the OBJ's material library."""
+    base_dir = os.path.dirname(os.path.abspath(file_path))
+    for line in mtllib_lines:
+        mtl_path = os.path.join(base_dir, line.decode(errors='replace').strip())
+        if not os.path.exists(mtl_path):
+            continue
+        with open(mtl_path, errors='replace') as f:
+            for mtl_line in f:
+                if mtl_line.strip().startswith('map_Kd'):
+                    texture = mtl_line.strip().split(None, 1)[1]
+                    return os.path.join(os.path.dirname(mtl_path), texture)
+    return None
+
+def parse_obj(file_path):
+    """Parse an OBJ file into arrays with bulk NumPy conversions.
+
+    Polygons with more than three corners are fan-triangulated and v, v/vt,
+    v//vn and v/vt/vn corners are all understood, also mixed in one file,
+    as are trailing comments. Relative (negative) indices count back from
+    the elements defined before their face line, as the OBJ spec says. Returns a dict of arrays (vertices, faces,
+    uvs, face_uvs, normals) and the texture path.
+    """
+    with open(file_path, 'rb') as f:
+        lines = f.read().splitlines()
+
+    vertex_lines, uv_lines, face_lines, mtllib_lines = [], [], [], []
+    # Vertices and uvs defined before each face line, for its relative indices
+    defined = []
+    for line in lines:
+        if line.startswith(b'v '):
+            vertex_lines.append(line[2:])
+        elif line.startswith(b'vt '):
+            uv_lines.append(line[3:])
+        elif line.startswith(b'f '):
+            face_lines.append(line[2:].split(b'#', 1)[0])
+            defined.append((len(vertex_lines), len(uv_lines)))
+        elif line.startswith(b'mtllib '):
+            mtllib_lines.append(line[7:])
+
+    vertices = _load_columns(vertex_lines, (0, 1, 2), np.float64)
+    uvs = _load_columns(uv_lines, (0, 1), np.float64)
+
+    corner_indices, counts = _parse_corners(face_lines, file_path)
+    defined = np.repeat(np.array(defined, dtype=np.int64).reshape(-1, 2), counts, axis=0)
+
+    triangles = _triangulate(counts)
+    faces = _resolve_indices(corner_indices[:, 0], defined[:, 0], len(vertices), file_path,
+                             'vertex')[triangles].astype(np.int32)
+    if len(uvs) and np.all(corner_indices[:, 1] != 0):
+        face_uvs = _resolve_indices(corner_indices[:, 1], defined[:, 1], len(uvs), file_path,
+                                    'uv')[triangles].astype(np.int32)
+    else:
+        face_uvs = np.zeros((0, 3), dtype=np.int32)
+
+    arrays = {
+        'vertices': vertices,
+        'faces': faces,
+        'uvs': uvs,
+        'face_uvs': face_uvs,
+        'normals': vertex_normals(vertices, faces),
+    }
+    return arrays, _texture_path(file_path, mtllib_lines)
+
+def load_obj(file_path, cache_dir=DEFAULT_CACHE_DIR):
+    """Parsed OBJ arrays, memory-mapped from the cache when the file was seen before.
+
+    The cache entry is keyed by the file's content hash, so moved or copied
+    scans hit the cache and edited ones are re-parsed.
+    """
+    entry_dir = os.path.join(cache_dir, f"{file_digest(file_path, cache_dir)}-v{CACHE_VERSION}")
+    meta_path = os.path.join(entry_dir, 'meta.json')
+    if not os.path.exists(meta_path):
+        arrays, texture = parse_obj(file_path)
+        # Build the entry next to its final place and move it in atomically,
+        # so concurrent workers never see a half-written entry
+        tmp_dir = tempfile.mkdtemp(dir=cache_dir)
+        for name in ARRAY_NAMES:
+            np.save(os.path.join(tmp_dir, f"{name}.npy"), arrays[name])
+        with open(os.path.join(tmp_dir, 'meta.json'), 'w') as f:
+            json.dump({'source': os.path.abspath(file_path), 'texture': texture}, f)
+        try:
+            os.rename(tmp_dir, entry_dir)
+        except OSError:
+            shutil.rmtree(tmp_dir, ignore_errors=True)  # Another process got there first
+
+    with open(meta_path) as f:
+        meta = json.load(f)
+    arrays = {name: np.load(os.path.join(entry_dir, f"{name}.npy"), mmap_mode='r') for name in ARRAY_NAMES}
+    return arrays, meta['texture']
+
+def load_triangle_mesh(file_path, cache_dir=DEFAULT_CACHE_DIR):
+    """Cached equivalent of o3d.io.read_triangle_mesh(path, True) + compute_vertex_normals()."""
+    import open3d as o3d
+
+    with telemetry.timer('load'):
+        arrays, texture = load_obj(file_path, cache_dir)
+    mesh = o3d.geometry.TriangleMesh(o3d.utility.Vector3dVector(np.asarray(arrays['vertices'])),
+                                     o3d.utility.Vector3iVector(np.asarray(arrays['faces'])))
+    mesh.vertex_normals = o3d.utility.Vector3dVector(np.asarray(arrays['normals']))
+    if len(arrays['face_uvs']) and texture and os.path.exists(texture):
+        uvs = np.asarray(arrays['uvs'])[np.asarray(arrays['face_uvs'])].reshape(-1, 2)
+        mesh.triangle_uvs = o3d.utility.Vector2dVector(uvs)
+        mesh.triangle_material_ids = o3d.utility.IntVector(np.zeros(len(arrays['faces']), dtype=np.int32))
+        # Open3D's own OBJ reader stores textures flipped to match the OpenGL uv origin
+        mesh.textures = [o3d.io.read_image(texture).flip_vertical()]
+    return mesh
@@ -0,0 +1,95 @@
+import numpy as np
+
+# Upper bound on the (planes x vertices) signed-distance block computed at once
+MAX_BLOCK_BYTES = 256 * 1024 * 1024
+
+def signed_distances(vertices, plane_origins, plane_normals):
+    """(P, V) signed distances of every vertex to every plane."""
+    offsets = np.einsum('ij,ij->i', plane_origins, plane_normals)
+    return plane_normals @ vertices.T - offsets[:, None]
+
+def _intersecting(distances, faces):
+    """(P, F) mask of faces whose vertices are not all strictly on one side.
+
+    Each vertex gets a code (1 above, 4 below, 0 on the plane); summing the
+    codes of a face gives 3 only if all three are above and 12 only if all
+    three are below, which is the same test as min * max <= 0.
+    """
+    codes = (distances > 0).astype(np.uint8) + 4 * (distances < 0).astype(np.uint8)
+    face_codes = codes[:, faces[:, 0]] + codes[:, faces[:, 1]] + codes[:, faces[:, 2]]
+    return (face_codes != 3) & (face_codes != 12)
+
+def slice_mask(vertices, faces, plane_origins, plane_normals, max_block_bytes=MAX_BLOCK_BYTES):
+    """Boolean (P, F) mask of the faces cut by each of P planes.
+
+    The planes are processed in blocks so the (P, V) distance matrix stays
+    under max_block_bytes regardless of mesh size.
+    """
+    vertices = np.asarray(vertices)
+    faces = np.asarray(faces)
+    plane_origins = np.atleast_2d(np.asarray(plane_origins, dtype=vertices.dtype))
+    plane_normals = np.atleast_2d(np.asarray(plane_normals, dtype=vertices.dtype))
+    plane_origins = np.broadcast_to(plane_origins, plane_normals.shape)
+
+    num_planes = len(plane_normals)
+    block = max(1, max_block_bytes // max(1, vertices.shape[0] * vertices.itemsize))
+    mask = np.empty((num_planes, len(faces)), dtype=bool)
+    for start in range(0, num_planes, block):
+        stop = min(start + block, num_planes)
+        distances = signed_distances(vertices, plane_origins[start:stop], plane_normals[start:stop])
+        mask[start:stop] = _intersecting(distances, faces)
+    return mask
+
+def slice_faces(vertices, faces, plane_origins, plane_normals, max_block_bytes=MAX_BLOCK_BYTES):
+    """Per-plane arrays of the indices of the faces each plane cuts."""
+    mask = slice_mask(vertices, faces, plane_origins, plane_normals, max_block_bytes)
+    return [np.flatnonzero(row) for row in mask]
+
+class FaceProjectionIndex:
+    """Per-face min/max projection onto a reference normal, sorted for range queries.
+
+    Slicing with a normal n close to the reference n0 only has to test the
+    faces whose projected interval overlaps the plane offset widened by
+    radius * |n - n0|; every other face is provably on one side of the plane.
+    """
+
+    def __init__(self, vertices, faces, reference_normal):
+        self.vertices = np.asarray(vertices)
+        self.faces = np.asarray(faces)
+        self.reference_normal = np.asarray(reference_normal, dtype=np.float64)
+        self.reference_normal /= np.linalg.norm(self.reference_normal)
+
+        self.center = self.vertices.mean(axis=0)
+        centered = self.vertices - self.center
+        self.radius = np.sqrt((centered ** 2).sum(axis=1).max())
+
+        projections = centered @ self.reference_normal
+        face_projections = projections[self.faces]
+        face_min = face_projections.min(axis=1)
+        self.face_max = face_projections.max(axis=1)
+        self.order = np.argsort(face_min, kind='stable')
+        self.sorted_min = face_min[self.order]
+
+    def candidates(self, plane_origin, plane_normal):
+        """Indices of the faces that may be cut by the plane."""
+        plane_normal = np.asarray(plane_normal, dtype=np.float64)
+        offset = (np.asarray(plane_origin) - self.center) @ plane_normal
+        slack = self.radius * np.linalg.norm(plane_normal - self.reference_normal)
+        stop = np.searchsorted(self.sorted_min, offset + slack, side='right')
+        below = self.order[:stop]
+        return below[self.face_max[below] >= offset - slack]
+
+    def query(self, plane_origin, plane_normal):
+        """Indices of the faces cut by one plane, testing only the candidate faces."""
+        candidates = self.candidates(plane_origin, plane_normal)
+        if len(candidates) == 0:
+            return candidates
+        candidate_faces = self.faces[candidates]
+        distances = (self.vertices[candidate_faces] - plane_origin) @ plane_normal
+        hit = (distances.min(axis=1) * distances.max(axis=1)) <= 0
+        return np.sort(candidates[hit])
+
+    def query_batch(self, plane_origins, plane_normals):
+        """Per-plane face index arrays for a batch of planes near the reference normal."""
+        plane_origins = np.broadcast_to(plane_origins, np.shape(plane_normals))
+        return [self.query(o, n) for o, n in zip(plane_origins, plane_normals)]
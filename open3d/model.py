@@ -1,17 +1,18 @@
 from ultralytics import YOLO
+from packed_trainer import PackedDetectionTrainer
 
 # Load the YOLOv8 model
 model = YOLO("yolov8n")  # Use "yolov8n.yaml" for YOLOv8 Nano, change if you want a different version
 
 # Train the model
 model.train(
-    data="/home/zohaib/pytorch3d-renderer/open3d/data.yaml",  # Path to your dataset YAML file
+    data="/home/zohaib/pytorch3d-renderer/open3d/data.yaml",  # Path to your dataset YAML file (or train_packed/data.yaml from packed_dataset.py)
     epochs=70,  # Number of epochs (adjust based on your needs)
-    imgsz=640,  # Image size (adjust based on your needs)
+    imgsz=640,  # Image size (adjust based on your needs); render with train_imgsz=640 and pack decoded to skip decode/resize
     batch=24,  # Batch size (adjust based on your GPU memory)
     project="yolo_training",  # Project directory
     name="experiment",  # Experiment name
     save_period=25,  # Save model checkpoints every epoch
-    augment=True
+    augment=True,
+    trainer=PackedDetectionTrainer  # Reads packed datasets; plain image directories train as before
 )
-
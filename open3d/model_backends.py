@@ -0,0 +1,40 @@
+import os
+
+# Ultralytics export arguments and the file or directory each export writes next to the weights
+BACKENDS = {
+    'torch': {'export': None, 'suffix': '.pt'},
+    'onnx': {'export': {'format': 'onnx', 'simplify': True}, 'suffix': '.onnx'},
+    'openvino': {'export': {'format': 'openvino'}, 'suffix': '_openvino_model'},
+    'openvino-int8': {'export': {'format': 'openvino', 'int8': True}, 'suffix': '_int8_openvino_model'},
+}
+
+def exported_path(weights, backend):
+    """Where the export of weights (a .pt file) for backend lives."""
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown model backend {backend!r}, expected one of {sorted(BACKENDS)}")
+    return os.path.splitext(weights)[0] + BACKENDS[backend]['suffix']
+
+def export_model(weights, backend, imgsz=640, data=None):
+    """Export weights for backend unless the export already exists; returns its path.
+
+    INT8 quantization calibrates on the images of the data YAML, so data is
+    required for 'openvino-int8'.
+    """
+    from ultralytics import YOLO
+
+    path = exported_path(weights, backend)
+    if BACKENDS[backend]['export'] is None or os.path.exists(path):
+        return path
+    if BACKENDS[backend]['export'].get('int8') and data is None:
+        raise ValueError("INT8 export needs a data YAML with calibration images")
+    exported = YOLO(weights).export(imgsz=imgsz, data=data, **BACKENDS[backend]['export'])
+    return str(exported)
+
+def load_model(weights, backend='torch'):
+    """YOLO model for backend, loaded from the export of weights made by export_model."""
+    from ultralytics import YOLO
+
+    path = exported_path(weights, backend)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"No {backend} export at {path}, run export_benchmark.py first")
+    return YOLO(path, task='detect')
@@ -0,0 +1,106 @@
+import cv2
+import numpy as np
+
+class MotionGate:
+    """Cheap scene-change test on a small grayscale copy of each frame.
+
+    A frame counts as changed when more than threshold of its pixels differ
+    by over pixel_delta grey levels from the reference frame, which is the
+    last frame the detector ran on. Comparing against that frame rather than
+    the previous one also catches slow changes that build up over frames.
+    """
+
+    def __init__(self, threshold=0.02, pixel_delta=25, size=(160, 90)):
+        self.threshold = threshold
+        self.pixel_delta = pixel_delta
+        self.size = size
+        self.reference = None
+
+    def small_gray(self, frame):
+        gray = cv2.cvtColor(cv2.resize(frame, self.size, interpolation=cv2.INTER_AREA), cv2.COLOR_BGR2GRAY)
+        # Blur away sensor noise so it does not count as motion
+        return cv2.GaussianBlur(gray, (5, 5), 0)
+
+    def changed_fraction(self, gray):
+        if self.reference is None:
+            return 1.0
+        return np.count_nonzero(cv2.absdiff(gray, self.reference) > self.pixel_delta) / gray.size
+
+    def set_reference(self, gray):
+        self.reference = gray
+
+class BoxPropagator:
+    """Carries detections forward between detector runs at a constant per-track velocity.
+
+    Velocities are measured in pixels per frame between the last two
+    detections of each track id; untracked boxes (id -1) are held still.
+    This is a plain linear extrapolation, not the tracker's Kalman
+    prediction, so it drifts on accelerating or turning objects.
+    """
+
+    def __init__(self):
+        self.detections = None
+        self.frame_index = 0
+        self.last_seen = {}  # track id -> (frame index, box)
+        self.velocity = np.zeros((0, 4), dtype=np.float32)
+
+    def update(self, detections, frame_index):
+        velocity = np.zeros_like(detections.xyxy)
+        for i, (track_id, box) in enumerate(zip(detections.track_id, detections.xyxy)):
+            if track_id == -1:
+                continue
+            if track_id in self.last_seen:
+                seen_index, seen_box = self.last_seen[track_id]
+                if frame_index > seen_index:
+                    velocity[i] = (box - seen_box) / (frame_index - seen_index)
+            self.last_seen[track_id] = (frame_index, box)
+        # Forget tracks that the detector no longer reports
+        live = set(detections.track_id.tolist())
+        self.last_seen = {k: v for k, v in self.last_seen.items() if k in live}
+        self.detections, self.frame_index, self.velocity = detections, frame_index, velocity
+
+    def predict(self, frame_index, width, height):
+        if self.detections is None:
+            return None
+        xyxy = self.detections.xyxy + self.velocity * (frame_index - self.frame_index)
+        xyxy[:, [0, 2]] = xyxy[:, [0, 2]].clip(0, width - 1)
+        xyxy[:, [1, 3]] = xyxy[:, [1, 3]].clip(0, height - 1)
+        return self.detections._replace(xyxy=xyxy.astype(np.float32))
+
+def gated_detector(detect, every=5, threshold=0.02, pixel_delta=25, stats=None):
+    """Wrap a detection function so the detector only runs when it is likely needed.
+
+    The detector runs on the first frame, at least every `every` frames, and
+    whenever the MotionGate sees more than threshold of the scene change. On
+    the frames in between, the last detections are propagated by
+    BoxPropagator. stats, if given, is a dict that gets 'detected' and
+    'propagated' frame counts.
+    """
+    gate = MotionGate(threshold, pixel_delta)
+    propagator = BoxPropagator()
+    state = {'frame': 0, 'since_detect': 0}
+    if stats is not None:
+        stats.update(detected=0, propagated=0)
+
+    def gated(frame):
+        frame_index = state['frame']
+        state['frame'] += 1
+        gray = gate.small_gray(frame)
+        if state['since_detect'] + 1 < every and gate.changed_fraction(gray) <= threshold:
+            state['since_detect'] += 1
+            height, width = frame.shape[:2]
+            detections = propagator.predict(frame_index, width, height)
+            if detections is not None:
+                if stats is not None:
+                    stats['propagated'] += 1
+                return detections
+
+        detections = detect(frame)
+        propagator.update(detections, frame_index)
+        gate.set_reference(gray)
+        state['since_detect'] = 0
+        if stats is not None:
+            stats['detected'] += 1
+        return detections
+
+    return gated
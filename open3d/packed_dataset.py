@@ -0,0 +1,194 @@
+import cv2
+import json
+import os
+import yaml
+import numpy as np
+from image_io import AsyncImageWriter, letterbox, list_images
+from yolo_labels import letterbox_label_line
+
+# index.npy columns, one row per sample
+SHARD, OFFSET, LENGTH, HEIGHT, WIDTH, LABEL_START, LABEL_COUNT = range(7)
+
+DEFAULT_SHARD_BYTES = 1 << 30
+
+def read_yolo_labels(label_file):
+    """(n, 5) float32 rows of class, center_x, center_y, width, height; empty if the file is missing."""
+    if not os.path.exists(label_file):
+        return np.zeros((0, 5), dtype=np.float32)
+    with open(label_file) as f:
+        rows = [line.split()[:5] for line in f if len(line.split()) >= 5]
+    return np.array(rows, dtype=np.float32).reshape(-1, 5)
+
+def letterbox_dataset(image_dir, label_dir, output_image_dir, output_label_dir, size=640, fmt=None):
+    """Resample already rendered images and their YOLO labels to size x size letterboxes.
+
+    For renders made before the pipeline could letterbox at render time;
+    box and polygon labels are moved to match. fmt is an image_io.ImageFormat.
+    """
+    os.makedirs(output_label_dir, exist_ok=True)
+    os.makedirs(output_image_dir, exist_ok=True)
+    image_files = list_images(image_dir)
+    with AsyncImageWriter(fmt) as writer:
+        for i, image_file in enumerate(image_files):
+            image = cv2.imread(image_file)
+            if image is None:
+                print(f"Could not read {image_file}, skipping.")
+                continue
+            height, width = image.shape[:2]
+            name = os.path.splitext(os.path.basename(image_file))[0]
+            writer.write_image(writer.image_path(output_image_dir, name), letterbox(image, size))
+
+            label_file = os.path.join(label_dir, name + '.txt')
+            if os.path.exists(label_file):
+                with open(label_file) as f:
+                    lines = [letterbox_label_line(line, width, height, size) for line in f if line.split()]
+                writer.write_text(os.path.join(output_label_dir, name + '.txt'), lines)
+
+            if (i + 1) % 1000 == 0:
+                print(f"{i+1}/{len(image_files)} images letterboxed...")
+    print(f"Letterboxed {len(image_files)} images to {size}x{size} in {output_image_dir}.")
+
+def pack_dataset(image_dir, label_dir, output_dir, shard_bytes=DEFAULT_SHARD_BYTES, data_yaml=None, decoded=False):
+    """Pack a directory of images and YOLO labels into a few large shard files.
+
+    Images are stored still encoded, back to back in shard_NNNNN.bin files of
+    about shard_bytes each. index.npy holds one row per sample (shard, byte
+    offset, byte length, height, width, first label row, label count) and
+    labels.npy every label row of every sample in one array. If data_yaml is
+    given it is copied in with train/val pointing at the packed directory.
+
+    With decoded, every image is also stored decoded in images.npy, an
+    (N, H, W, 3) BGR array that training memory-maps instead of decoding.
+    All images must then have the same size; render or letterbox_dataset
+    them at the training imgsz first so training does not resize them either.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    image_files = list_images(image_dir)
+    # PackedDataset serves images.npy whenever it exists, so one left by an earlier decoded pack must go
+    decoded_path = os.path.join(output_dir, 'images.npy')
+    if os.path.exists(decoded_path):
+        os.remove(decoded_path)
+
+    index = np.zeros((len(image_files), 7), dtype=np.int64)
+    labels = []
+    names = []
+    label_rows = 0
+    shard_id, shard_offset = 0, 0
+    shard = open(os.path.join(output_dir, f"shard_{shard_id:05d}.bin"), 'wb')
+    decoded_images = None
+    for i, image_file in enumerate(image_files):
+        with open(image_file, 'rb') as f:
+            data = f.read()
+        if shard_offset and shard_offset + len(data) > shard_bytes:
+            shard.close()
+            shard_id, shard_offset = shard_id + 1, 0
+            shard = open(os.path.join(output_dir, f"shard_{shard_id:05d}.bin"), 'wb')
+        shard.write(data)
+
+        # The image size is needed at load time without decoding, so decode once here
+        image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+        height, width = image.shape[:2]
+        if decoded:
+            if decoded_images is None:
+                decoded_images = np.lib.format.open_memmap(decoded_path, mode='w+', dtype=np.uint8,
+                                                           shape=(len(image_files),) + image.shape)
+            if image.shape != decoded_images.shape[1:]:
+                raise ValueError(f"{image_file} is {width}x{height}, but a decoded pack needs every image at "
+                                 f"{decoded_images.shape[2]}x{decoded_images.shape[1]}")
+            decoded_images[i] = image
+        name = os.path.splitext(os.path.basename(image_file))[0]
+        sample_labels = read_yolo_labels(os.path.join(label_dir, name + '.txt'))
+        index[i] = (shard_id, shard_offset, len(data), height, width, label_rows, len(sample_labels))
+        labels.append(sample_labels)
+        names.append(os.path.basename(image_file))
+        label_rows += len(sample_labels)
+        shard_offset += len(data)
+
+        if (i + 1) % 1000 == 0:
+            print(f"{i+1}/{len(image_files)} images packed...")
+    shard.close()
+    if decoded_images is not None:
+        decoded_images.flush()
+        del decoded_images
+
+    np.save(os.path.join(output_dir, 'index.npy'), index)
+    np.save(os.path.join(output_dir, 'labels.npy'),
+            np.concatenate(labels) if labels else np.zeros((0, 5), dtype=np.float32))
+    with open(os.path.join(output_dir, 'names.json'), 'w') as f:
+        json.dump(names, f)
+
+    if data_yaml:
+        with open(data_yaml) as f:
+            data = yaml.safe_load(f)
+        data['train'] = data['val'] = os.path.abspath(output_dir)
+        with open(os.path.join(output_dir, 'data.yaml'), 'w') as f:
+            yaml.safe_dump(data, f, sort_keys=False)
+
+    print(f"Packed {len(image_files)} images and {label_rows} labels into {shard_id + 1} shards in {output_dir}.")
+
+def is_packed(path):
+    return os.path.isfile(os.path.join(str(path), 'index.npy'))
+
+class PackedDataset:
+    """Random access to a packed dataset through memory-mapped shards.
+
+    Opening it reads two small arrays; no directory listing or per-sample
+    file open happens, and the shards are only paged in as samples are read.
+    Packs made with decoded=True serve images straight from images.npy.
+    """
+
+    def __init__(self, packed_dir):
+        self.packed_dir = str(packed_dir)
+        self.index = np.load(os.path.join(self.packed_dir, 'index.npy'))
+        self.labels = np.load(os.path.join(self.packed_dir, 'labels.npy'), mmap_mode='r')
+        with open(os.path.join(self.packed_dir, 'names.json')) as f:
+            self.names = json.load(f)
+        self._shards = {}
+        decoded_path = os.path.join(self.packed_dir, 'images.npy')
+        self.decoded = np.load(decoded_path, mmap_mode='r') if os.path.exists(decoded_path) else None
+
+    def __len__(self):
+        return len(self.index)
+
+    def _shard(self, shard_id):
+        # Opened lazily so each dataloader worker maps the shards itself
+        if shard_id not in self._shards:
+            path = os.path.join(self.packed_dir, f"shard_{shard_id:05d}.bin")
+            self._shards[shard_id] = np.memmap(path, dtype=np.uint8, mode='r')
+        return self._shards[shard_id]
+
+    def image_bytes(self, i):
+        """Encoded bytes of sample i, as a view into its shard."""
+        row = self.index[i]
+        return self._shard(int(row[SHARD]))[row[OFFSET]:row[OFFSET] + row[LENGTH]]
+
+    def image(self, i):
+        """Decoded BGR image of sample i."""
+        if self.decoded is not None:
+            # A private copy, since augmentation may write into it
+            return np.array(self.decoded[i])
+        return cv2.imdecode(self.image_bytes(i), cv2.IMREAD_COLOR)
+
+    def image_labels(self, i):
+        """(n, 5) label rows of sample i."""
+        row = self.index[i]
+        return np.asarray(self.labels[row[LABEL_START]:row[LABEL_START] + row[LABEL_COUNT]])
+
+    def shape(self, i):
+        return int(self.index[i, HEIGHT]), int(self.index[i, WIDTH])
+
+    def __getitem__(self, i):
+        return self.image(i), self.image_labels(i)
+
+if __name__ == "__main__":
+    # Parameters
+    train_imgsz = None  # e.g. 640 (model.py's imgsz) to letterbox full-size renders and keep them decoded
+
+    # Pack the rendered training set next to it
+    if train_imgsz:
+        letterbox_dataset('train/images', 'train/labels', 'train_letterboxed/images', 'train_letterboxed/labels',
+                          train_imgsz)
+        pack_dataset('train_letterboxed/images', 'train_letterboxed/labels', 'train_packed', data_yaml='data.yaml',
+                     decoded=True)
+    else:
+        pack_dataset('train/images', 'train/labels', 'train_packed', data_yaml='data.yaml')
@@ -0,0 +1,89 @@
+import cv2
+import math
+from ultralytics.data import YOLODataset
+from ultralytics.models.yolo.detect import DetectionTrainer
+from ultralytics.utils import colorstr
+from ultralytics.utils.torch_utils import de_parallel
+from packed_dataset import PackedDataset, is_packed
+
+class PackedYOLODataset(YOLODataset):
+    """Ultralytics detection dataset read from a packed_dataset directory instead of image files."""
+
+    def __init__(self, *args, **kwargs):
+        # The on-disk .npy cache writes next to image files, which packed samples do not have
+        if kwargs.get('cache') == 'disk':
+            kwargs['cache'] = None
+        super().__init__(*args, **kwargs)
+
+    def get_img_files(self, img_path):
+        self.packed = PackedDataset(img_path)
+        # Stand-in file names, used only for plots and logging
+        return [f"{self.packed.packed_dir}/{name}" for name in self.packed.names]
+
+    def get_labels(self):
+        labels = []
+        for i, im_file in enumerate(self.im_files):
+            rows = self.packed.image_labels(i)
+            labels.append({
+                'im_file': im_file,
+                'shape': self.packed.shape(i),
+                'cls': rows[:, 0:1].copy(),
+                'bboxes': rows[:, 1:5].copy(),
+                'segments': [],
+                'keypoints': None,
+                'normalized': True,
+                'bbox_format': 'xywh',
+            })
+        return labels
+
+    def load_image(self, i, rect_mode=True):
+        """Same resizing and buffering as BaseDataset.load_image, decoding from the shard."""
+        if self.ims[i] is not None:
+            return self.ims[i], self.im_hw0[i], self.im_hw[i]
+
+        im = self.packed.image(i)
+        if im is None:
+            raise FileNotFoundError(f"Could not decode packed sample {self.im_files[i]}")
+        h0, w0 = im.shape[:2]
+        if rect_mode:
+            r = self.imgsz / max(h0, w0)
+            if r != 1:
+                w, h = (min(math.ceil(w0 * r), self.imgsz), min(math.ceil(h0 * r), self.imgsz))
+                im = cv2.resize(im, (w, h), interpolation=cv2.INTER_LINEAR)
+        elif not (h0 == w0 == self.imgsz):
+            im = cv2.resize(im, (self.imgsz, self.imgsz), interpolation=cv2.INTER_LINEAR)
+
+        if self.augment:
+            self.ims[i], self.im_hw0[i], self.im_hw[i] = im, (h0, w0), im.shape[:2]
+            self.buffer.append(i)
+            if 1 < len(self.buffer) >= self.max_buffer_length:
+                j = self.buffer.pop(0)
+                if self.cache != 'ram':
+                    self.ims[j], self.im_hw0[j], self.im_hw[j] = None, None, None
+        return im, (h0, w0), im.shape[:2]
+
+class PackedDetectionTrainer(DetectionTrainer):
+    """DetectionTrainer that reads packed_dataset directories; plain image directories work as before."""
+
+    def build_dataset(self, img_path, mode='train', batch=None):
+        if not is_packed(img_path):
+            return super().build_dataset(img_path, mode, batch)
+        gs = max(int(de_parallel(self.model).stride.max() if self.model else 0), 32)
+        cfg = self.args
+        return PackedYOLODataset(
+            img_path=img_path,
+            imgsz=cfg.imgsz,
+            batch_size=batch,
+            augment=mode == 'train',
+            hyp=cfg,
+            rect=cfg.rect or mode == 'val',
+            cache=cfg.cache or None,
+            single_cls=cfg.single_cls or False,
+            stride=gs,
+            pad=0.0 if mode == 'train' else 0.5,
+            prefix=colorstr(f"{mode}: "),
+            task=cfg.task,
+            classes=cfg.classes,
+            data=self.data,
+            fraction=cfg.fraction if mode == 'train' else 1.0,
+        )
@@ -0,0 +1,155 @@
+import numpy as np
+
+# One row per pose: its index in the table, the object rotation as a unit
+# quaternion (w, x, y, z) and as a 3x3 matrix. Rows are independent of each
+# other, so any slice of the table can be rendered on its own.
+POSE_DTYPE = np.dtype([('index', np.int32), ('quaternion', np.float64, (4,)), ('rotation', np.float64, (3, 3))])
+
+GOLDEN_ANGLE = np.pi * (3 - np.sqrt(5))
+
+def rotation_x(angles):
+    """(N, 3, 3) rotations about the x axis by angles in radians."""
+    c, s = np.cos(angles), np.sin(angles)
+    one, zero = np.ones_like(angles), np.zeros_like(angles)
+    return np.stack([np.stack([one, zero, zero], -1),
+                     np.stack([zero, c, -s], -1),
+                     np.stack([zero, s, c], -1)], -2)
+
+def rotation_y(angles):
+    """(N, 3, 3) rotations about the y axis by angles in radians."""
+    c, s = np.cos(angles), np.sin(angles)
+    one, zero = np.ones_like(angles), np.zeros_like(angles)
+    return np.stack([np.stack([c, zero, s], -1),
+                     np.stack([zero, one, zero], -1),
+                     np.stack([-s, zero, c], -1)], -2)
+
+def rotation_z(angles):
+    """(N, 3, 3) rotations about the z axis by angles in radians."""
+    c, s = np.cos(angles), np.sin(angles)
+    one, zero = np.ones_like(angles), np.zeros_like(angles)
+    return np.stack([np.stack([c, -s, zero], -1),
+                     np.stack([s, c, zero], -1),
+                     np.stack([zero, zero, one], -1)], -2)
+
+def directions_from_angles(elevation, azimuth):
+    """Unit view directions from elevation (above the xz plane) and azimuth (about +y), in radians."""
+    return np.stack([np.cos(elevation) * np.sin(azimuth),
+                     np.sin(elevation),
+                     np.cos(elevation) * np.cos(azimuth)], axis=-1)
+
+def rotations_facing(directions, roll=None):
+    """Object rotations that turn each view direction towards the camera on +z.
+
+    The object's +y axis is kept as close to image-up as possible, then an
+    optional roll (radians) spins the view about the optical axis.
+    """
+    directions = directions / np.linalg.norm(directions, axis=1, keepdims=True)
+    up = np.broadcast_to([0.0, 1.0, 0.0], directions.shape)
+    # Looking straight down or up the y axis: fall back to z as the up hint
+    polar = np.abs(directions[:, 1]) > 0.999
+    up = np.where(polar[:, None], [0.0, 0.0, 1.0], up)
+    x_axis = np.cross(up, directions)
+    x_axis /= np.linalg.norm(x_axis, axis=1, keepdims=True)
+    y_axis = np.cross(directions, x_axis)
+    rotations = np.stack([x_axis, y_axis, directions], axis=1)
+    if roll is not None:
+        rotations = rotation_z(roll) @ rotations
+    return rotations
+
+def rotations_to_quaternions(rotations):
+    """(N, 4) unit quaternions (w, x, y, z) with w >= 0 for (N, 3, 3) rotation matrices."""
+    m = rotations
+    trace = np.trace(m, axis1=1, axis2=2)
+    # Each row uses the largest of the four candidate denominators for stability
+    candidates = np.stack([trace, m[:, 0, 0], m[:, 1, 1], m[:, 2, 2]], axis=1)
+    pick = candidates.argmax(axis=1)
+    q = np.empty((len(m), 4))
+
+    r = pick == 0
+    s = np.sqrt(1.0 + trace[r]) * 2
+    q[r] = np.stack([0.25 * s, (m[r, 2, 1] - m[r, 1, 2]) / s,
+                     (m[r, 0, 2] - m[r, 2, 0]) / s, (m[r, 1, 0] - m[r, 0, 1]) / s], axis=1)
+    r = pick == 1
+    s = np.sqrt(1.0 + m[r, 0, 0] - m[r, 1, 1] - m[r, 2, 2]) * 2
+    q[r] = np.stack([(m[r, 2, 1] - m[r, 1, 2]) / s, 0.25 * s,
+                     (m[r, 0, 1] + m[r, 1, 0]) / s, (m[r, 0, 2] + m[r, 2, 0]) / s], axis=1)
+    r = pick == 2
+    s = np.sqrt(1.0 + m[r, 1, 1] - m[r, 0, 0] - m[r, 2, 2]) * 2
+    q[r] = np.stack([(m[r, 0, 2] - m[r, 2, 0]) / s, (m[r, 0, 1] + m[r, 1, 0]) / s,
+                     0.25 * s, (m[r, 1, 2] + m[r, 2, 1]) / s], axis=1)
+    r = pick == 3
+    s = np.sqrt(1.0 + m[r, 2, 2] - m[r, 0, 0] - m[r, 1, 1]) * 2
+    q[r] = np.stack([(m[r, 1, 0] - m[r, 0, 1]) / s, (m[r, 0, 2] + m[r, 2, 0]) / s,
+                     (m[r, 1, 2] + m[r, 2, 1]) / s, 0.25 * s], axis=1)
+
+    q *= np.where(q[:, :1] < 0, -1.0, 1.0)
+    return q / np.linalg.norm(q, axis=1, keepdims=True)
+
+def turntable(num_poses, rng, pitch_jitter=6.0):
+    """Evenly spaced turns about the vertical axis with a small random pitch.
+
+    The absolute, non-compounding version of the original capture loop.
+    """
+    yaw = np.radians(np.arange(num_poses) * 360.0 / num_poses)
+    pitch = np.radians(rng.uniform(-pitch_jitter, pitch_jitter, size=num_poses))
+    return rotation_x(pitch) @ rotation_y(yaw)
+
+def fibonacci_sphere(num_poses, rng, max_roll=0.0):
+    """Near-uniform views of the whole sphere along a randomly rotated Fibonacci spiral."""
+    i = np.arange(num_poses) + 0.5
+    elevation = np.arcsin(1 - 2 * i / num_poses)
+    azimuth = GOLDEN_ANGLE * i + rng.uniform(0, 2 * np.pi)
+    roll = np.radians(rng.uniform(-max_roll, max_roll, size=num_poses))
+    return rotations_facing(directions_from_angles(elevation, azimuth), roll)
+
+def stratified_jitter(num_poses, rng, max_roll=0.0):
+    """One random view in each cell of an equal-area elevation x azimuth grid."""
+    rows = max(1, int(round(np.sqrt(num_poses / 2))))
+    cols = int(np.ceil(num_poses / rows))
+    cell = np.arange(num_poses)
+    # Uniform in sin(elevation) and azimuth gives equal-area cells
+    u = (cell // cols + rng.uniform(size=num_poses)) / rows
+    v = (cell % cols + rng.uniform(size=num_poses)) / cols
+    elevation = np.arcsin(1 - 2 * u)
+    azimuth = 2 * np.pi * v
+    roll = np.radians(rng.uniform(-max_roll, max_roll, size=num_poses))
+    return rotations_facing(directions_from_angles(elevation, azimuth), roll)
+
+def elevation_bands(num_poses, rng, bands=((-10, 10), (10, 35), (35, 60)), max_roll=0.0):
+    """Full turns at a few camera heights, e.g. shelf-level, eye-level and top-down views.
+
+    Poses are split evenly over the bands (elevations in degrees); inside a
+    band the azimuth is evenly spaced and the elevation jittered.
+    """
+    band = np.arange(num_poses) % len(bands)
+    elevation = np.empty(num_poses)
+    azimuth = np.empty(num_poses)
+    for b, (low, high) in enumerate(bands):
+        members = np.flatnonzero(band == b)
+        elevation[members] = rng.uniform(low, high, size=len(members))
+        azimuth[members] = (np.arange(len(members)) + rng.uniform()) * 360.0 / max(1, len(members))
+    roll = np.radians(rng.uniform(-max_roll, max_roll, size=num_poses))
+    return rotations_facing(directions_from_angles(np.radians(elevation), np.radians(azimuth)), roll)
+
+SAMPLERS = {
+    'turntable': turntable,
+    'fibonacci': fibonacci_sphere,
+    'stratified': stratified_jitter,
+    'bands': elevation_bands,
+}
+
+def make_pose_table(sampler, num_poses, seed=0, **kwargs):
+    """Seeded table of num_poses object poses (see POSE_DTYPE) from a named sampler.
+
+    The same sampler, count, seed and options always give the same table, so
+    workers can each render their own slice of it.
+    """
+    if sampler not in SAMPLERS:
+        raise ValueError(f"Unknown pose sampler {sampler!r}, expected one of {sorted(SAMPLERS)}")
+    rng = np.random.default_rng(seed)
+    rotations = SAMPLERS[sampler](num_poses, rng, **kwargs)
+    table = np.zeros(num_poses, dtype=POSE_DTYPE)
+    table['index'] = np.arange(num_poses)
+    table['rotation'] = rotations
+    table['quaternion'] = rotations_to_quaternions(rotations)
+    return table
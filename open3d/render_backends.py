@@ -0,0 +1,121 @@
+import numpy as np
+import open3d as o3d
+from collections import namedtuple
+
+# image: (H, W, 3) uint8 RGB. depth: (H, W) float32 with 0 on the background,
+# or None when depth was not requested. intrinsic (3x3) and extrinsic (4x4)
+# map the mesh's original (unposed) vertices into this frame.
+Frame = namedtuple('Frame', ['image', 'depth', 'intrinsic', 'extrinsic'])
+
+def posed_extrinsic(extrinsic, rotation, center):
+    """Extrinsic that shows the object rotated about center, with the geometry left untouched."""
+    transform = np.eye(4)
+    transform[:3, :3] = rotation
+    transform[:3, 3] = center - rotation @ center
+    return extrinsic @ transform
+
+def look_at_extrinsic(eye, target, up):
+    """World-to-camera matrix (x right, y down, z forward) for a camera at eye looking at target."""
+    forward = target - eye
+    forward = forward / np.linalg.norm(forward)
+    right = np.cross(forward, up)
+    right = right / np.linalg.norm(right)
+    down = np.cross(forward, right)
+    extrinsic = np.eye(4)
+    extrinsic[:3, :3] = np.stack([right, down, forward])
+    extrinsic[:3, 3] = -extrinsic[:3, :3] @ eye
+    return extrinsic
+
+def default_camera(mesh, width, height, fov_degrees=60.0):
+    """Pinhole camera on +Z looking at the mesh, far enough back to fit its bounding sphere."""
+    vertices = np.asarray(mesh.vertices)
+    center = vertices.mean(axis=0)
+    radius = np.linalg.norm(vertices - center, axis=1).max()
+    half_fov = np.radians(fov_degrees) / 2
+    focal = (height / 2) / np.tan(half_fov)
+    intrinsic = np.array([[focal, 0, (width - 1) / 2],
+                          [0, focal, (height - 1) / 2],
+                          [0, 0, 1]])
+    eye = center + np.array([0, 0, radius / np.sin(half_fov)])
+    return intrinsic, look_at_extrinsic(eye, center, np.array([0.0, 1.0, 0.0]))
+
+class VisualizerBackend:
+    """Legacy hidden-window Visualizer; poses are applied by rotating the mesh in place."""
+
+    def __init__(self, mesh, width=1920, height=1080, with_depth=False):
+        self.mesh = mesh
+        self.with_depth = with_depth
+        self.center = mesh.get_center()
+        self.rotation = np.eye(3)
+
+        self.vis = o3d.visualization.Visualizer()
+        self.vis.create_window(width=width, height=height, visible=False)
+        self.vis.add_geometry(mesh)
+        params = self.vis.get_view_control().convert_to_pinhole_camera_parameters()
+        self.intrinsic = np.asarray(params.intrinsic.intrinsic_matrix)
+        self.extrinsic = np.asarray(params.extrinsic)
+
+    def render(self, rotation):
+        # Rotate by the difference to the previous pose, about the fixed center
+        self.mesh.rotate(rotation @ self.rotation.T, center=self.center)
+        self.rotation = rotation
+
+        self.vis.update_geometry(self.mesh)
+        self.vis.poll_events()
+        self.vis.update_renderer()
+        image = np.asarray(self.vis.capture_screen_float_buffer(do_render=False))
+        image = (image * 255).round().astype(np.uint8)
+        depth = np.asarray(self.vis.capture_depth_float_buffer(do_render=False)) if self.with_depth else None
+        return Frame(image, depth, self.intrinsic, posed_extrinsic(self.extrinsic, rotation, self.center))
+
+    def close(self):
+        # Leave the mesh the way it was handed in
+        self.mesh.rotate(self.rotation.T, center=self.center)
+        self.rotation = np.eye(3)
+        self.vis.destroy_window()
+
+class OffscreenBackend:
+    """Headless Filament renderer; the scene is built once and only the camera moves.
+
+    Needs no window system, so it also runs on display-less build boxes.
+    """
+
+    def __init__(self, mesh, width=1920, height=1080, with_depth=False, background=(1.0, 1.0, 1.0, 1.0)):
+        self.width = width
+        self.height = height
+        self.with_depth = with_depth
+        self.center = np.asarray(mesh.vertices).mean(axis=0)
+
+        self.renderer = o3d.visualization.rendering.OffscreenRenderer(width, height)
+        self.renderer.scene.set_background(list(background))
+        material = o3d.visualization.rendering.MaterialRecord()
+        material.shader = 'defaultLit'
+        if mesh.has_textures():
+            material.albedo_img = mesh.textures[0]
+        self.renderer.scene.add_geometry('mesh', mesh, material)
+        self.intrinsic, self.extrinsic = default_camera(mesh, width, height)
+
+    def render(self, rotation):
+        extrinsic = posed_extrinsic(self.extrinsic, rotation, self.center)
+        self.renderer.setup_camera(self.intrinsic, extrinsic, self.width, self.height)
+        image = np.asarray(self.renderer.render_to_image())
+        depth = None
+        if self.with_depth:
+            depth = np.asarray(self.renderer.render_to_depth_image(z_in_view_space=True))
+            depth = np.where(np.isfinite(depth), depth, 0).astype(np.float32)
+        return Frame(image, depth, self.intrinsic, extrinsic)
+
+    def close(self):
+        self.renderer.scene.clear_geometry()
+        del self.renderer
+
+BACKENDS = {
+    'visualizer': VisualizerBackend,
+    'offscreen': OffscreenBackend,
+}
+
+def create_backend(name, mesh, width=1920, height=1080, with_depth=False):
+    """Render backend by name: 'visualizer' (hidden window) or 'offscreen' (headless)."""
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown render backend {name!r}, expected one of {sorted(BACKENDS)}")
+    return BACKENDS[name](mesh, width, height, with_depth)
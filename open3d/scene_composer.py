@@ -0,0 +1,307 @@
+import os
+import multiprocessing as mp
+import numpy as np
+from functools import partial
+import telemetry
+from image_io import AsyncImageWriter, image_format, letterbox, training_render_size
+from render_backends import look_at_extrinsic
+from poses import directions_from_angles, rotation_y
+from yolo_labels import (get_class_mapping, get_class_id, mesh_class_name, bbox_from_mask, polygon_from_mask,
+                         yolo_bbox_line, yolo_polygon_line, letterbox_label_line)
+
+# This process's SceneRenderer, mesh class ids and render size, set up once by open_scene
+_SCENE = {}
+
+def footprint(vertices):
+    """Ground anchor (x, y_min, z) and radius in the xz plane of an upright mesh's vertices."""
+    vertices = np.asarray(vertices)
+    anchor = np.array([vertices[:, 0].mean(), vertices[:, 1].min(), vertices[:, 2].mean()])
+    radius = np.linalg.norm(vertices[:, [0, 2]] - anchor[[0, 2]], axis=1).max()
+    return anchor, radius
+
+def random_layout(radii, rng, density=0.45, gap=0.02, max_tries=200):
+    """Non-overlapping (x, z) ground positions for objects with the given footprint radii.
+
+    Objects are placed largest first by rejection sampling inside a square
+    sized so the footprints cover about density of it, at least gap (as a
+    fraction of the larger radius) apart. Positions of objects that found no
+    free spot within max_tries are None.
+    """
+    radii = np.asarray(radii, dtype=np.float64)
+    half_extent = np.sqrt(np.pi * (radii ** 2).sum() / density) / 2
+    positions = [None] * len(radii)
+    placed = []
+    for i in np.argsort(-radii):
+        low, high = -half_extent + radii[i], half_extent - radii[i]
+        for _ in range(max_tries):
+            candidate = rng.uniform(low, high, 2) if high > low else np.zeros(2)
+            if all(np.linalg.norm(candidate - p) >= (radii[i] + radii[j]) * (1 + gap) for j, p in placed):
+                positions[i] = candidate
+                placed.append((i, candidate))
+                break
+    return positions
+
+def object_transform(anchor, position, yaw):
+    """4x4 transform standing a mesh on the ground at (x, z) position, turned by yaw radians about +y."""
+    rotation = rotation_y(np.array([yaw]))[0]
+    transform = np.eye(4)
+    transform[:3, :3] = rotation
+    transform[:3, 3] = np.array([position[0], 0.0, position[1]]) - rotation @ anchor
+    return transform
+
+def scene_camera(centers, radii, heights, width, height, rng, elevation=(10, 40), fov_degrees=60.0, margin=1.05):
+    """Intrinsic and extrinsic of a camera at a random elevation and azimuth that keeps every object in view."""
+    centers = np.asarray(centers)
+    target = np.array([centers[:, 0].mean(), np.mean(heights) / 2, centers[:, 1].mean()])
+    # Bounding sphere of the objects' bounding cylinders around the target
+    offsets = np.linalg.norm(centers - target[[0, 2]], axis=1) + radii
+    radius = np.sqrt(offsets ** 2 + np.maximum(np.asarray(heights) - target[1], target[1]) ** 2).max()
+    half_fov = np.radians(fov_degrees) / 2
+    focal = (height / 2) / np.tan(half_fov)
+    intrinsic = np.array([[focal, 0, (width - 1) / 2],
+                          [0, focal, (height - 1) / 2],
+                          [0, 0, 1]])
+    direction = directions_from_angles(np.radians(rng.uniform(*elevation)), rng.uniform(0, 2 * np.pi))
+    eye = target + direction * margin * radius / np.sin(min(half_fov, np.arctan(width / (2 * focal))))
+    return intrinsic, look_at_extrinsic(eye, target, np.array([0.0, 1.0, 0.0]))
+
+def visible_masks(full_depth, object_depths, tolerance=0.005):
+    """Per object, its pixels in the scene (visible) and when rendered alone (unoccluded).
+
+    A pixel of an object's solo render is visible when the full scene's depth
+    there matches the object's own depth within tolerance (relative), i.e.
+    nothing else is in front of it.
+    """
+    masks = []
+    for depth in object_depths:
+        alone = depth > 0
+        visible = alone & (np.abs(full_depth - depth) <= tolerance * depth)
+        masks.append((visible, alone))
+    return masks
+
+def scene_labels(full_depth, object_depths, class_ids, min_visibility=0.3, min_pixels=64, with_polygon=False):
+    """YOLO box (and optional polygon) lines of every object visible enough in a composed scene.
+
+    The box is drawn around the visible part of the object. Objects with
+    less than min_visibility of their unoccluded pixels (or fewer than
+    min_pixels) left in view are not labelled. Also returns each object's
+    visibility ratio.
+    """
+    image_height, image_width = full_depth.shape
+    box_lines, seg_lines, ratios = [], [], []
+    for (visible, alone), class_id in zip(visible_masks(full_depth, object_depths), class_ids):
+        visible_pixels, total_pixels = visible.sum(), alone.sum()
+        ratio = visible_pixels / total_pixels if total_pixels else 0.0
+        ratios.append(float(ratio))
+        if ratio < min_visibility or visible_pixels < min_pixels:
+            continue
+        box_lines.append(yolo_bbox_line(class_id, bbox_from_mask(visible), image_width, image_height))
+        if with_polygon:
+            seg_lines.append(yolo_polygon_line(class_id, polygon_from_mask(visible), image_width, image_height))
+    return box_lines, seg_lines, ratios
+
+class SceneRenderer:
+    """Headless renderer holding max_per_mesh instances of every mesh in one Filament scene.
+
+    The instances are uploaded once; each composed scene only shows a subset
+    of them and moves them into place, so no geometry is re-uploaded between
+    frames.
+    """
+
+    def __init__(self, meshes, width=1920, height=1080, max_per_mesh=3, background=(1.0, 1.0, 1.0, 1.0)):
+        import open3d as o3d
+
+        self.width = width
+        self.height = height
+        self.renderer = o3d.visualization.rendering.OffscreenRenderer(width, height)
+        self.renderer.scene.set_background(list(background))
+        self.instances = []  # (geometry name, mesh index)
+        self.footprints = []
+        for m, mesh in enumerate(meshes):
+            vertices = np.asarray(mesh.vertices)
+            anchor, radius = footprint(vertices)
+            self.footprints.append((anchor, radius, vertices[:, 1].max() - anchor[1]))
+            material = o3d.visualization.rendering.MaterialRecord()
+            material.shader = 'defaultLit'
+            if mesh.has_textures():
+                material.albedo_img = mesh.textures[0]
+            for k in range(max_per_mesh):
+                name = f"mesh{m}_{k}"
+                self.renderer.scene.add_geometry(name, mesh, material)
+                self.renderer.scene.show_geometry(name, False)
+                self.instances.append((name, m))
+
+    def _depth(self):
+        depth = np.asarray(self.renderer.render_to_depth_image(z_in_view_space=True))
+        return np.where(np.isfinite(depth), depth, 0).astype(np.float32)
+
+    def render(self, instances, positions, yaws, rng, elevation=(10, 40)):
+        """Render the chosen instances at their layout; returns the image, the full depth and one depth per instance."""
+        anchors, radii, heights = zip(*(self.footprints[self.instances[i][1]] for i in instances))
+        for i, anchor, position, yaw in zip(instances, anchors, positions, yaws):
+            self.renderer.scene.set_geometry_transform(self.instances[i][0], object_transform(anchor, position, yaw))
+        intrinsic, extrinsic = scene_camera(positions, np.array(radii), heights, self.width, self.height, rng,
+                                            elevation)
+        self.renderer.setup_camera(intrinsic, extrinsic, self.width, self.height)
+
+        for i in instances:
+            self.renderer.scene.show_geometry(self.instances[i][0], True)
+        image = np.asarray(self.renderer.render_to_image())
+        full_depth = self._depth()
+        # One depth-only pass per object on its own, to measure how much of it the others hide
+        for i in instances:
+            self.renderer.scene.show_geometry(self.instances[i][0], False)
+        object_depths = []
+        for i in instances:
+            self.renderer.scene.show_geometry(self.instances[i][0], True)
+            object_depths.append(self._depth())
+            self.renderer.scene.show_geometry(self.instances[i][0], False)
+        return image, full_depth, object_depths
+
+    def close(self):
+        self.renderer.scene.clear_geometry()
+        del self.renderer
+
+def compose_scene(scene_renderer, class_ids, rng, num_objects=(3, 8), elevation=(10, 40)):
+    """Pick num_objects random instances, lay them out without overlap and render them.
+
+    Returns the image, full depth, per-object depths and the class of each
+    rendered object.
+    """
+    count = min(rng.integers(num_objects[0], num_objects[1] + 1), len(scene_renderer.instances))
+    chosen = rng.choice(len(scene_renderer.instances), count, replace=False)
+    radii = [scene_renderer.footprints[scene_renderer.instances[i][1]][1] for i in chosen]
+    positions = random_layout(radii, rng)
+    placed = [(i, p) for i, p in zip(chosen, positions) if p is not None]
+    instances = [i for i, _ in placed]
+    yaws = rng.uniform(0, 2 * np.pi, len(instances))
+    with telemetry.timer('render'):
+        image, full_depth, object_depths = scene_renderer.render(instances, [p for _, p in placed], yaws, rng,
+                                                                 elevation)
+    return image, full_depth, object_depths, [class_ids[scene_renderer.instances[i][1]] for i in instances]
+
+def load_library(root_dir):
+    """Upright meshes of every .obj under root_dir with a known class (its subdirectory), and their class ids."""
+    from main_nested_slicing import find_obj_files, load_upright_mesh
+
+    class_mapping = get_class_mapping(root_dir)
+    meshes, class_ids = [], []
+    for obj_file_path in find_obj_files(root_dir):
+        class_id = get_class_id(mesh_class_name(obj_file_path, root_dir), class_mapping)
+        if class_id == -1:
+            print(f"Unknown class for {obj_file_path}, left out of the scenes.")
+            continue
+        meshes.append(load_upright_mesh(obj_file_path))
+        class_ids.append(class_id)
+    if not meshes:
+        raise ValueError(f"No meshes of a known class under {root_dir}; expected <root_dir>/<class>/*.obj for the "
+                         f"classes {sorted(class_mapping)}")
+    return meshes, class_ids
+
+def open_scene(options):
+    """Load the mesh library into this process's SceneRenderer; once per process, as a pool initializer."""
+    width, height = options['image_width'], options['image_height']
+    if options['letterbox_size']:
+        width, height = training_render_size(width, height, options['letterbox_size'])
+    meshes, class_ids = load_library(options['root_dir'])
+    _SCENE.update(renderer=SceneRenderer(meshes, width, height, options['max_per_mesh']), class_ids=class_ids,
+                  size=(width, height))
+
+def close_scene():
+    _SCENE.pop('renderer').close()
+    _SCENE.clear()
+
+def render_scenes(options, scene_range):
+    """Render scenes [start, stop) with their labels on the renderer set up by open_scene.
+
+    Every scene is seeded by its own index, so it comes out identical
+    however the range is split across workers. Returns the number of scenes
+    and of labelled objects.
+    """
+    start, stop = scene_range
+    scene_renderer, class_ids, (width, height) = _SCENE['renderer'], _SCENE['class_ids'], _SCENE['size']
+    writer = AsyncImageWriter(options['output_format'])
+    labelled = 0
+    try:
+        for index in range(start, stop):
+            rng = np.random.default_rng([options['seed'], index])
+            image, full_depth, object_depths, scene_class_ids = compose_scene(
+                scene_renderer, class_ids, rng, options['num_objects'], options['elevation'])
+            with telemetry.timer('label'):
+                box_lines, seg_lines, _ = scene_labels(full_depth, object_depths, scene_class_ids,
+                                                       options['min_visibility'],
+                                                       with_polygon=options['seg_dir'] is not None)
+            if options['letterbox_size']:
+                size = options['letterbox_size']
+                image = letterbox(image, size)
+                box_lines = [letterbox_label_line(line, width, height, size) for line in box_lines]
+                seg_lines = [letterbox_label_line(line, width, height, size) for line in seg_lines]
+            telemetry.count('objects_labelled', len(box_lines))
+            labelled += len(box_lines)
+
+            name = f"scene_{index + 1:05d}"
+            writer.write_image(writer.image_path(options['output_dir'], name), image, rgb=True)
+            writer.write_text(os.path.join(options['label_dir'], f"{name}.txt"), box_lines)
+            if options['seg_dir']:
+                writer.write_text(os.path.join(options['seg_dir'], f"{name}.txt"), seg_lines)
+    finally:
+        writer.close()
+    return stop - start, labelled
+
+def compose_dataset(root_dir, num_scenes=500, num_objects=(3, 8), max_per_mesh=3, min_visibility=0.3,
+                    elevation=(10, 40), segmentation=False, image_width=1920, image_height=1080, output_format=None,
+                    letterbox_size=None, num_workers=1, scenes_per_shard=50, seed=0):
+    """Render num_scenes multi-object scenes from the meshes under root_dir into ./train/.
+
+    Every scene stands between num_objects[0] and num_objects[1] randomly
+    chosen instances (at most max_per_mesh of each mesh) side by side on the
+    ground, seen from a random azimuth and an elevation in the given range
+    (degrees). Images go to ./train/images/scene_<i>, one YOLO line per
+    object at least min_visibility unoccluded to ./train/labels/ and, with
+    segmentation, its polygon to ./train/labels_seg/. Rendering is headless
+    and split into shards of scenes_per_shard over num_workers processes;
+    each process uploads the meshes once and renders all its shards.
+    """
+    root_dir = os.path.abspath(root_dir)
+    options = {'root_dir': root_dir, 'num_objects': num_objects, 'max_per_mesh': max_per_mesh,
+               'min_visibility': min_visibility, 'elevation': elevation, 'image_width': image_width,
+               'image_height': image_height, 'output_format': output_format or image_format('png'),
+               'letterbox_size': letterbox_size, 'seed': seed,
+               'output_dir': os.path.abspath('./train/images/'), 'label_dir': os.path.abspath('./train/labels/'),
+               'seg_dir': os.path.abspath('./train/labels_seg/') if segmentation else None}
+    for directory in (options['output_dir'], options['label_dir'], options['seg_dir']):
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    shards = [(start, min(start + scenes_per_shard, num_scenes)) for start in range(0, num_scenes, scenes_per_shard)]
+    done, labelled = 0, 0
+    if num_workers > 1:
+        # Spawn fresh interpreters so each worker gets a clean OpenGL context
+        with mp.get_context("spawn").Pool(num_workers, initializer=open_scene, initargs=(options,)) as pool:
+            task = telemetry.collect(partial(render_scenes, options))
+            for scenes, objects in map(telemetry.merged, pool.imap_unordered(task, shards)):
+                done, labelled = done + scenes, labelled + objects
+                print(f"{done}/{num_scenes} scenes saved, {labelled} objects labelled...")
+    else:
+        open_scene(options)
+        try:
+            for shard in shards:
+                scenes, objects = render_scenes(options, shard)
+                done, labelled = done + scenes, labelled + objects
+                print(f"{done}/{num_scenes} scenes saved, {labelled} objects labelled...")
+        finally:
+            close_scene()
+    print(f"All {num_scenes} scenes saved in {options['output_dir']}, {labelled / max(num_scenes, 1):.1f} "
+          f"labelled objects per scene.")
+
+if __name__ == "__main__":
+    # Parameters
+    root_directory = 'models_'
+    num_scenes = 500
+    objects_per_scene = (3, 8)  # Inclusive range
+    min_visibility = 0.3  # Objects hidden more than this are left unlabelled
+    num_workers = 1
+    train_imgsz = None  # e.g. 640 to render letterboxed at model.py's imgsz
+
+    compose_dataset(root_directory, num_scenes, objects_per_scene, min_visibility=min_visibility,
+                    num_workers=num_workers, letterbox_size=train_imgsz)
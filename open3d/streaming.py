@@ -0,0 +1,96 @@
+import os
+import cv2
+import numpy as np
+import telemetry
+from image_io import AsyncImageWriter, letterbox, letterbox_geometry
+from yolo_labels import frame_labels, yolo_line_to_bbox
+
+def stream_frames(renderer, poses, names):
+    """Render each pose, yielding one item per frame that the next stages fill in."""
+    for pose, name in zip(poses, names):
+        with telemetry.timer('render'):
+            frame = renderer.render(pose)
+        telemetry.count('frames_rendered')
+        yield {'name': name, 'frame': frame, 'box_line': None, 'seg_line': None, 'overlay': None}
+
+def letterbox_frames(items, size):
+    """Letterbox every frame (image, depth and camera) to size x size, the way YOLO feeds it to the model.
+
+    Runs before labelling, so the labels come out in letterboxed coordinates.
+    """
+    for item in items:
+        frame = item['frame']
+        height, width = frame.image.shape[:2]
+        scale, (left, top), _ = letterbox_geometry(width, height, size)
+        intrinsic = frame.intrinsic.copy()
+        intrinsic[:2] *= scale
+        intrinsic[:2, 2] += [left, top]
+        with telemetry.timer('letterbox'):
+            image = letterbox(frame.image, size)
+            depth = None
+            if frame.depth is not None:
+                depth = letterbox(frame.depth, size, color=0, interpolation=cv2.INTER_NEAREST)
+        item['frame'] = frame._replace(image=image, depth=depth, intrinsic=intrinsic)
+        yield item
+
+def label_frames(items, vertices, class_id, label_source='projection', with_polygon=False):
+    """Attach YOLO detection (and optionally segmentation) lines to each item."""
+    for item in items:
+        with telemetry.timer('label'):
+            item['box_line'], item['seg_line'] = frame_labels(item['frame'], vertices, class_id, label_source, with_polygon)
+        yield item
+
+def overlay_frames(items):
+    """Attach a copy of each frame with its label box drawn in green."""
+    for item in items:
+        with telemetry.timer('draw'):
+            image = item['frame'].image
+            overlay = np.ascontiguousarray(image.copy())
+            if item['box_line']:
+                height, width = image.shape[:2]
+                x, y, w, h = (int(round(v)) for v in yolo_line_to_bbox(item['box_line'], width, height))
+                cv2.rectangle(overlay, (x, y), (x + w, y + h), (0, 255, 0), 2)
+        item['overlay'] = overlay
+        yield item
+
+def write_frames(items, writer, image_dir, label_dir=None, seg_dir=None, overlay_dir=None):
+    """Hand every item's outputs to the writer, yielding the saved image path."""
+    for item in items:
+        image_path = writer.image_path(image_dir, item['name'])
+        writer.write_image(image_path, item['frame'].image, rgb=True)
+        if label_dir and item['box_line']:
+            writer.write_text(os.path.join(label_dir, f"{item['name']}.txt"), [item['box_line']])
+        if seg_dir and item['seg_line']:
+            writer.write_text(os.path.join(seg_dir, f"{item['name']}.txt"), [item['seg_line']])
+        if overlay_dir and item['overlay'] is not None:
+            writer.write_image(writer.image_path(overlay_dir, item['name']), item['overlay'], rgb=True)
+        yield image_path
+
+def render_to_disk(renderer, poses, names, vertices, image_dir, class_id=-1, label_dir=None, seg_dir=None,
+                   overlay_dir=None, label_source='projection', image_format=None, num_writer_threads=4,
+                   max_pending=16, letterbox_size=None):
+    """Render -> label -> overlay -> encode/write, keeping frames in memory.
+
+    Labels are only produced when class_id is known and a label or overlay
+    directory is given. Images are encoded as image_format (an
+    image_io.ImageFormat, PNG by default) on a writer thread pool that holds
+    at most max_pending frames. With letterbox_size, frames are letterboxed
+    to that square training size before labelling. Yields each image path
+    once it is queued.
+    """
+    for directory in (image_dir, label_dir, seg_dir, overlay_dir):
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    writer = AsyncImageWriter(image_format, num_writer_threads, max_pending)
+    try:
+        items = stream_frames(renderer, poses, names)
+        if letterbox_size:
+            items = letterbox_frames(items, letterbox_size)
+        if class_id != -1 and (label_dir or seg_dir or overlay_dir):
+            items = label_frames(items, vertices, class_id, label_source, with_polygon=seg_dir is not None)
+        if overlay_dir:
+            items = overlay_frames(items)
+        yield from write_frames(items, writer, image_dir, label_dir, seg_dir, overlay_dir)
+    finally:
+        writer.close()
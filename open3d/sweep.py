@@ -0,0 +1,169 @@
+import csv
+import itertools
+import json
+import math
+import multiprocessing as mp
+import os
+import random
+import time
+
+THREAD_ENV_VARS = ('OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'NUMEXPR_NUM_THREADS')
+
+def sample_trials(search_space, num_trials=None, seed=0):
+    """Parameter dicts from a {name: [values]} search space.
+
+    The full grid when num_trials is None or at least the grid size,
+    otherwise num_trials distinct grid points picked with the given seed.
+    """
+    names = sorted(search_space)
+    grid = [dict(zip(names, values)) for values in itertools.product(*(search_space[n] for n in names))]
+    if num_trials is None or num_trials >= len(grid):
+        return grid
+    return random.Random(seed).sample(grid, num_trials)
+
+def rung_epochs(min_epochs, max_epochs, eta):
+    """Cumulative epoch budget of every successive-halving rung: min_epochs * eta**k, capped at max_epochs."""
+    budgets = []
+    epochs = min_epochs
+    while epochs < max_epochs:
+        budgets.append(epochs)
+        epochs *= eta
+    return budgets + [max_epochs]
+
+def _limit_threads(threads):
+    # Runs in each fresh worker before torch is imported, so its pools are sized once
+    for name in THREAD_ENV_VARS:
+        os.environ[name] = str(threads)
+
+def _final_metrics(save_dir):
+    """mAP50 and mAP50-95 of the last epoch, from Ultralytics' results.csv."""
+    with open(os.path.join(save_dir, 'results.csv')) as f:
+        rows = [{k.strip(): v for k, v in row.items()} for row in csv.DictReader(f)]
+    last = rows[-1]
+    return float(last['metrics/mAP50(B)']), float(last['metrics/mAP50-95(B)'])
+
+def run_trial(task):
+    """Worker entry point: train one trial for one rung and return its validation mAP.
+
+    A trial that raises is returned with its error instead, so one bad
+    configuration does not end the sweep.
+    """
+    start = time.perf_counter()
+    try:
+        return _train_trial(task)
+    except Exception as e:
+        return dict(task, error=f"{type(e).__name__}: {e}", seconds=time.perf_counter() - start)
+
+def _train_trial(task):
+    import torch
+    from ultralytics import YOLO
+    from packed_trainer import PackedDetectionTrainer
+
+    torch.set_num_threads(task['threads'])
+    start = time.perf_counter()
+    model = YOLO(task['weights'])
+    model.train(
+        data=task['data'],
+        epochs=task['epochs'],
+        project=task['project'],
+        name=f"trial{task['trial']:03d}_rung{task['rung']}",
+        exist_ok=True,
+        device='cpu',
+        workers=max(task['threads'] // 2, 1),
+        plots=False,
+        verbose=False,
+        trainer=PackedDetectionTrainer,
+        **task['params'],
+    )
+    save_dir = str(model.trainer.save_dir)
+    map50, map50_95 = _final_metrics(save_dir)
+    return dict(task, error=None, map50=map50, map50_95=map50_95, seconds=time.perf_counter() - start,
+                best=os.path.join(save_dir, 'weights', 'best.pt'))
+
+def successive_halving(search_space, data, base_model='yolov8n.pt', num_trials=None, min_epochs=5, max_epochs=70,
+                       eta=3, num_workers=None, threads_per_worker=None, project='yolo_sweep', seed=0):
+    """Hyperparameter sweep around model.py's training, stopping weak trials early.
+
+    Every trial first trains for min_epochs; after each rung only the best
+    1/eta of the trials (by validation mAP50-95) go on to the next, larger
+    epoch budget, up to max_epochs. A promoted trial continues from its own
+    best.pt for the extra epochs, so only the learning-rate schedule
+    restarts. A trial that fails is marked failed with its error and not
+    promoted; the others carry on. Trials run on a pool of num_workers processes with
+    threads_per_worker threads each (by default the CPU split evenly), so
+    they do not oversubscribe the cores. Returns the leaderboard, best
+    first, and writes it to <project>/leaderboard.json and .csv.
+    """
+    num_workers = num_workers or max(os.cpu_count() // 4, 1)
+    threads = threads_per_worker or max(os.cpu_count() // num_workers, 1)
+    budgets = rung_epochs(min_epochs, max_epochs, eta)
+    trials = sample_trials(search_space, num_trials, seed)
+    print(f"{len(trials)} trials, rungs of {budgets} epochs, {num_workers} workers x {threads} threads")
+
+    os.makedirs(project, exist_ok=True)
+    project = os.path.abspath(project)
+    leaderboard = {i: {'trial': i, 'params': params, 'epochs': 0, 'rung': -1, 'map50': 0.0, 'map50_95': 0.0,
+                       'seconds': 0.0, 'best': None, 'error': None}
+                   for i, params in enumerate(trials)}
+    survivors = list(leaderboard)
+
+    ctx = mp.get_context('spawn')
+    # One task per process, so every trial starts with a clean torch state
+    with ctx.Pool(num_workers, initializer=_limit_threads, initargs=(threads,), maxtasksperchild=1) as pool:
+        for rung, budget in enumerate(budgets):
+            tasks = []
+            for i in survivors:
+                entry = leaderboard[i]
+                tasks.append({'trial': i, 'rung': rung, 'params': entry['params'], 'data': data,
+                              'project': project, 'threads': threads,
+                              'weights': entry['best'] or base_model, 'epochs': budget - entry['epochs']})
+            for result in pool.imap_unordered(run_trial, tasks):
+                entry = leaderboard[result['trial']]
+                if result['error']:
+                    # Keeps the results of the last rung it finished
+                    entry.update(seconds=entry['seconds'] + result['seconds'], error=result['error'])
+                    print(f"[rung {rung}] trial {result['trial']} {entry['params']} failed: {result['error']}")
+                    continue
+                entry.update(epochs=entry['epochs'] + result['epochs'], rung=rung, map50=result['map50'],
+                             map50_95=result['map50_95'], seconds=entry['seconds'] + result['seconds'],
+                             best=result['best'])
+                print(f"[rung {rung}] trial {result['trial']} {entry['params']}: mAP50-95 {result['map50_95']:.3f} "
+                      f"after {entry['epochs']} epochs")
+
+            survivors = [i for i in survivors if not leaderboard[i]['error']]
+            ranked = sorted(survivors, key=lambda i: leaderboard[i]['map50_95'], reverse=True)
+            survivors = ranked[:max(math.ceil(len(ranked) / eta), 1)]
+            if rung < len(budgets) - 1:
+                print(f"Rung {rung} done, promoting trials {survivors}")
+
+    ranking = sorted(leaderboard.values(), key=lambda e: (e['rung'], e['map50_95']), reverse=True)
+    with open(os.path.join(project, 'leaderboard.json'), 'w') as f:
+        json.dump(ranking, f, indent=2)
+    param_names = sorted(search_space)
+    with open(os.path.join(project, 'leaderboard.csv'), 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['trial', 'rung', 'epochs', 'map50', 'map50_95', 'seconds'] + param_names + ['best', 'error'])
+        for e in ranking:
+            writer.writerow([e['trial'], e['rung'], e['epochs'], f"{e['map50']:.4f}", f"{e['map50_95']:.4f}",
+                             f"{e['seconds']:.0f}"] + [e['params'][n] for n in param_names] + [e['best'], e['error']])
+    if ranking[0]['rung'] < 0:
+        print(f"All {len(ranking)} trials failed, see {project}/leaderboard.json")
+        return ranking
+    print(f"Best trial {ranking[0]['trial']} {ranking[0]['params']}: mAP50-95 {ranking[0]['map50_95']:.3f}")
+    return ranking
+
+if __name__ == "__main__":
+    # Parameters
+    data_yaml = "/home/zohaib/pytorch3d-renderer/open3d/data.yaml"  # or train_packed/data.yaml
+    search_space = {
+        'imgsz': [416, 512, 640],
+        'batch': [16, 24, 32],
+        'degrees': [0.0, 10.0],  # Training-time rotation augmentation
+        'mosaic': [0.0, 1.0],
+        'fliplr': [0.0, 0.5],
+    }
+    num_trials = 27  # Sampled from the 72-point grid
+    num_workers = None  # Defaults to one trial per 4 cores
+
+    successive_halving(search_space, data_yaml, num_trials=num_trials, min_epochs=5, max_epochs=70, eta=3,
+                       num_workers=num_workers)
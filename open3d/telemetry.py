@@ -0,0 +1,297 @@
+import atexit
+import collections
+import contextlib
+import json
+import multiprocessing as mp
+import os
+import sys
+import threading
+import time
+from functools import partial
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Upper bounds in seconds, from sub-millisecond label writes to multi-second mesh loads
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def _key(name, labels):
+    return (name, tuple(sorted(labels.items())))
+
+def _format_key(name, labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return name
+    return name + '{' + ','.join(f'{k}="{v}"' for k, v in pairs) + '}'
+
+class Histogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        i = 0
+        while i < len(self.buckets) and value > self.buckets[i]:
+            i += 1
+        self.counts[i] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q):
+        """Upper bucket bound below which a fraction q of the observations fall."""
+        target, seen = q * self.count, 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= target:
+                return bound
+        return self.max
+
+class Telemetry:
+    """Thread-safe registry of counters and histograms, keyed by name and labels."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = collections.defaultdict(float)
+        self.histograms = {}
+
+    def count(self, name, value=1, **labels):
+        with self.lock:
+            self.counters[_key(name, labels)] += value
+
+    def observe(self, name, value, **labels):
+        key = _key(name, labels)
+        with self.lock:
+            if key not in self.histograms:
+                self.histograms[key] = Histogram()
+            self.histograms[key].observe(value)
+
+    @contextlib.contextmanager
+    def timer(self, stage):
+        """Time the block into the stage_seconds histogram under the given stage label."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe('stage_seconds', time.perf_counter() - start, stage=stage)
+
+    def drain(self):
+        """Take every metric out of the registry, in a picklable form that merge() accepts."""
+        with self.lock:
+            counters = dict(self.counters)
+            histograms = {key: (h.buckets, h.counts, h.count, h.sum, h.max) for key, h in self.histograms.items()}
+            self.counters.clear()
+            self.histograms.clear()
+        return counters, histograms
+
+    def merge(self, drained):
+        """Add metrics drained from another process's registry to this one."""
+        counters, histograms = drained
+        with self.lock:
+            for key, value in counters.items():
+                self.counters[key] += value
+            for key, (buckets, counts, count, total, maximum) in histograms.items():
+                if key not in self.histograms:
+                    self.histograms[key] = Histogram(buckets)
+                h = self.histograms[key]
+                h.counts = [a + b for a, b in zip(h.counts, counts)]
+                h.count += count
+                h.sum += total
+                h.max = max(h.max, maximum)
+
+    def snapshot(self):
+        """Plain-dict copy of every metric, as written to the JSONL file."""
+        with self.lock:
+            counters = {_format_key(name, labels): value for (name, labels), value in self.counters.items()}
+            histograms = {_format_key(name, labels): {'count': h.count, 'sum': h.sum, 'max': h.max,
+                                                      'p50': h.quantile(0.5), 'p99': h.quantile(0.99)}
+                          for (name, labels), h in self.histograms.items()}
+        return {'time': time.time(), 'pid': os.getpid(), 'counters': counters, 'histograms': histograms}
+
+    def prometheus_text(self, prefix='pipeline_'):
+        lines = []
+        with self.lock:
+            for (name, labels), value in sorted(self.counters.items()):
+                lines.append(f"{_format_key(prefix + name + '_total', labels)} {value}")
+            for (name, labels), h in sorted(self.histograms.items()):
+                cumulative = 0
+                for bound, count in zip(h.buckets, h.counts):
+                    cumulative += count
+                    lines.append(f"{_format_key(prefix + name + '_bucket', labels, [('le', bound)])} {cumulative}")
+                lines.append(f"{_format_key(prefix + name + '_bucket', labels, [('le', '+Inf')])} {h.count}")
+                lines.append(f"{_format_key(prefix + name + '_sum', labels)} {h.sum}")
+                lines.append(f"{_format_key(prefix + name + '_count', labels)} {h.count}")
+        return '\n'.join(lines) + '\n'
+
+class JsonlExporter:
+    """Appends a snapshot line every interval seconds, and a last one when stopped."""
+
+    def __init__(self, telemetry, path, interval=5.0):
+        self.telemetry = telemetry
+        self.path = path
+        self.interval = interval
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def write(self):
+        line = json.dumps(self.telemetry.snapshot()) + '\n'
+        # One write per line on an O_APPEND file keeps lines from several processes whole
+        with open(self.path, 'a') as f:
+            f.write(line)
+
+    def _run(self):
+        while not self.stopped.wait(self.interval):
+            self.write()
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+        self.write()
+
+def serve_prometheus(telemetry, port=9108, host='127.0.0.1'):
+    """Serve the metrics at http://host:port/metrics from a daemon thread; returns the server."""
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path != '/metrics':
+                self.send_error(404)
+                return
+            body = telemetry.prometheus_text().encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+class SamplingProfiler:
+    """Samples the stacks of all other threads at a fixed interval and counts folded stacks.
+
+    The output has one "frame;frame;frame count" line per distinct stack, the
+    input format of flamegraph.pl and speedscope.
+    """
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.stacks = collections.Counter()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        own_id = threading.get_ident()
+        names = {}
+        while not self.stopped.wait(self.interval):
+            for thread in threading.enumerate():
+                names[thread.ident] = thread.name
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, str(thread_id)))
+                with self.lock:
+                    self.stacks[';'.join(reversed(stack))] += 1
+
+    def write(self, path):
+        """Write the stacks sampled so far, replacing path."""
+        with self.lock:
+            stacks = self.stacks.most_common()
+        with open(path, 'w') as f:
+            for stack, count in stacks:
+                f.write(f"{stack} {count}\n")
+
+    def stop(self, path):
+        self.stopped.set()
+        self.thread.join()
+        self.write(path)
+
+TELEMETRY = Telemetry()
+count = TELEMETRY.count
+observe = TELEMETRY.observe
+timer = TELEMETRY.timer
+
+# The process the registry belongs to, and this process's profiler as (profiler, path)
+_owner_pid = os.getpid()
+_profiler = None
+
+def _start_profiler(environ):
+    global _profiler
+    # Each process profiles itself into its own file
+    path = environ['PIPELINE_PROFILE']
+    if mp.parent_process() is not None:
+        path = f"{path}.{os.getpid()}"
+    _profiler = (SamplingProfiler(float(environ.get('PIPELINE_PROFILE_INTERVAL', 0.005))), path)
+    atexit.register(_profiler[0].stop, path)
+
+def configure_from_env(telemetry=TELEMETRY, environ=os.environ):
+    """Start the exporters and profiler requested by environment variables, so no script has to change.
+
+    PIPELINE_TELEMETRY_JSONL=path appends a snapshot line every
+    PIPELINE_TELEMETRY_INTERVAL seconds (5) and at exit.
+    PIPELINE_TELEMETRY_PORT=9108 serves Prometheus text format on
+    127.0.0.1:<port>/metrics. Both run in the main process only; pool
+    workers report through it, when their tasks are wrapped in collect().
+    PIPELINE_PROFILE=path samples every thread's stack each
+    PIPELINE_PROFILE_INTERVAL seconds (0.005) and writes folded stacks to
+    path (path.<pid> for worker processes) at exit, and for pool workers
+    after every collected task.
+    """
+    if mp.parent_process() is None:
+        if environ.get('PIPELINE_TELEMETRY_JSONL'):
+            exporter = JsonlExporter(telemetry, environ['PIPELINE_TELEMETRY_JSONL'],
+                                     float(environ.get('PIPELINE_TELEMETRY_INTERVAL', 5.0)))
+            atexit.register(exporter.stop)
+        if environ.get('PIPELINE_TELEMETRY_PORT'):
+            serve_prometheus(telemetry, int(environ['PIPELINE_TELEMETRY_PORT']))
+    if environ.get('PIPELINE_PROFILE'):
+        _start_profiler(environ)
+
+def _adopt_process():
+    """On the first task of a forked worker, drop the metrics and profiler state inherited from the parent."""
+    global _owner_pid, _profiler
+    if _owner_pid == os.getpid():
+        return
+    _owner_pid = os.getpid()
+    # The lock may have been held by a parent thread that does not exist here
+    TELEMETRY.lock = threading.Lock()
+    TELEMETRY.counters.clear()
+    TELEMETRY.histograms.clear()
+    _profiler = None
+    if os.environ.get('PIPELINE_PROFILE'):
+        _start_profiler(os.environ)
+
+def _collected_call(fn, *args, **kwargs):
+    _adopt_process()
+    result = fn(*args, **kwargs)
+    if _profiler is not None:
+        # Pool.__exit__ terminates workers, so their atexit hooks never run
+        _profiler[0].write(_profiler[1])
+    return result, TELEMETRY.drain()
+
+def collect(fn):
+    """Wrap a pool task so it returns (result, the metrics it recorded); unwrap in the parent with merged().
+
+    Pool workers cannot export on their own: forked ones lose the exporter
+    threads and Pool's terminate() skips their atexit hooks.
+    """
+    return partial(_collected_call, fn)
+
+def merged(collected, telemetry=TELEMETRY):
+    """Add a collected task's metrics to the registry and return its result."""
+    result, drained = collected
+    telemetry.merge(drained)
+    return result
+
+configure_from_env()
@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+from dedup import HammingIndex, class_group, find_duplicates, foreground_crop, popcount
+
+def _brute_force(stored, value, max_distance):
+    distances = popcount(np.array(stored, dtype=np.uint64) ^ np.uint64(value))
+    matches = np.flatnonzero(distances <= max_distance)
+    return {int(d) for d in distances[matches]}
+
+@pytest.mark.parametrize('max_distance', [0, 3, 6])
+def test_hamming_index_matches_brute_force(max_distance):
+    rng = np.random.default_rng(max_distance)
+    stored = rng.integers(0, 2 ** 63, 200, dtype=np.uint64)
+    index = HammingIndex(max_distance)
+    for value in stored:
+        index.add(value)
+    # Queries near stored hashes (flipping up to 8 bits) and far from them
+    flips = [np.uint64(sum(1 << int(b) for b in rng.choice(64, k, replace=False))) for k in rng.integers(0, 9, 100)]
+    queries = [stored[i] ^ flip for i, flip in zip(rng.integers(0, len(stored), 100), flips)]
+    queries += list(rng.integers(0, 2 ** 63, 20, dtype=np.uint64))
+    for query in queries:
+        expected = _brute_force(stored, query, max_distance)
+        match = index.query(query)
+        if not expected:
+            assert match is None
+        else:
+            assert match is not None and match[1] == min(expected)
+            assert int(popcount(np.array([stored[match[0]] ^ query]))[0]) == match[1]
+
+def test_class_group_falls_back_to_one_group():
+    assert class_group('train/images/mug_00012.png') == 'mug'
+    assert class_group('images/image001.png') == ''
+
+def test_find_duplicates_groups_by_class():
+    files = ['mug_0.png', 'mug_1.png', 'cup_0.png', 'image001.png', 'image002.png']
+    hashes = np.array([0b1111, 0b1110, 0b1111, 0b1111, 0b0111], dtype=np.uint64)
+    duplicates = find_duplicates(files, hashes, max_distance=1)
+    # cup_0 matches mug_0 but is another class; main.py's unprefixed frames share one group
+    assert duplicates == {'mug_1.png': ('mug_0.png', 1), 'image002.png': ('image001.png', 1)}
+
+def test_foreground_crop_skips_letterbox_bars():
+    image = np.full((40, 60, 3), 255, dtype=np.uint8)
+    image[:8] = image[-8:] = 114
+    image[15:20, 25:35] = (0, 0, 200)
+    crop = foreground_crop(image)
+    assert crop.shape == (5, 10)
+    assert foreground_crop(np.full((40, 60, 3), 255, dtype=np.uint8)).shape == (40, 60)
@@ -0,0 +1,42 @@
+import threading
+import numpy as np
+import pytest
+
+from frame_ring import FrameRing
+
+@pytest.fixture
+def ring():
+    ring = FrameRing((2, 3, 3), slots=4, create=True, lock=threading.Lock(), readers=2)
+    yield ring
+    ring.close()
+    ring.unlink()
+
+def test_ring_needs_two_spare_slots():
+    with pytest.raises(ValueError):
+        FrameRing((2, 3, 3), slots=3, create=True, lock=threading.Lock(), readers=2)
+
+def test_claim_returns_newest_frame_once(ring):
+    for value in (1, 2, 3):
+        ring.write(np.full(ring.shape, value, dtype=np.uint8))
+    seq, view, _ = ring.claim(reader=0)
+    assert seq == 3 and (view == 3).all()
+    # Reader 1 must not take the frame reader 0 already claimed
+    assert ring.claim(reader=1, timeout=0.01) is None
+    ring.write(np.full(ring.shape, 4, dtype=np.uint8))
+    seq, view, _ = ring.claim(reader=1)
+    assert seq == 4 and (view == 4).all()
+
+def test_writer_skips_pinned_slots(ring):
+    ring.write(np.full(ring.shape, 1, dtype=np.uint8))
+    seq0, view0, _ = ring.claim(reader=0)
+    ring.write(np.full(ring.shape, 2, dtype=np.uint8))
+    seq1, view1, _ = ring.claim(reader=1)
+    # Many more writes than slots: the pinned frames stay intact and current
+    for value in range(3, 20):
+        ring.write(np.full(ring.shape, value, dtype=np.uint8))
+    assert (view0 == 1).all() and (view1 == 2).all()
+    assert ring.is_current(seq0) and ring.is_current(seq1)
+    ring.release(reader=0)
+    for value in range(20, 24):
+        ring.write(np.full(ring.shape, value, dtype=np.uint8))
+    assert not ring.is_current(seq0) and ring.is_current(seq1)
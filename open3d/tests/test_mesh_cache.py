@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+from mesh_cache import load_obj, parse_obj, vertex_normals
+
+# A quad as absolute v/vt corners, then a triangle mixing corner formats with
+# relative indices, defined before the last vertex and uv exist
+MIXED_OBJ = b"""# test mesh
+v 0 0 0
+v 1 0 0
+v 1 1 0
+v 0 1 0
+vt 0 0
+vt 1 0
+vt 1 1
+vn 0 0 1
+f 1/1 2/2 3/3 4/3  # quad
+f -4/-3 -3//1 -1/-1/1
+v 5 5 5
+vt 0.5 0.5
+f 2//1 5 3/1
+"""
+
+def write(tmp_path, text, name='mesh.obj'):
+    path = tmp_path / name
+    path.write_bytes(text)
+    return str(path)
+
+def test_mixed_corner_formats_and_relative_indices(tmp_path):
+    arrays, texture = parse_obj(write(tmp_path, MIXED_OBJ))
+    assert texture is None
+    assert arrays['vertices'].shape == (5, 3)
+    # -1 in the second face is vertex 4, the last one defined before it, not vertex 5
+    np.testing.assert_array_equal(arrays['faces'], [[0, 1, 2], [0, 2, 3], [0, 1, 3], [1, 4, 2]])
+    # The last face has corners without uvs, so no face uvs at all
+    assert arrays['face_uvs'].shape == (0, 3)
+
+def test_face_uvs_resolve_relative_to_their_line(tmp_path):
+    text = b"v 0 0 0\nv 1 0 0\nv 0 1 0\nvt 0 0\nvt 1 0\nf 1/-2 2/-1 3/-1\nvt 0 1\nf -3/-1 -2/1 -1/2\n"
+    arrays, _ = parse_obj(write(tmp_path, text))
+    np.testing.assert_array_equal(arrays['faces'], [[0, 1, 2], [0, 1, 2]])
+    np.testing.assert_array_equal(arrays['face_uvs'], [[0, 1, 1], [2, 0, 1]])
+
+@pytest.mark.parametrize('face', [b'f 1 2 4', b'f 0 1 2', b'f -4 1 2'])
+def test_out_of_range_indices_are_rejected(tmp_path, face):
+    with pytest.raises(ValueError, match='out of range'):
+        parse_obj(write(tmp_path, b"v 0 0 0\nv 1 0 0\nv 0 1 0\n" + face + b"\n"))
+
+def test_normals_are_unit_length(tmp_path):
+    arrays, _ = parse_obj(write(tmp_path, MIXED_OBJ))
+    np.testing.assert_allclose(np.linalg.norm(arrays['normals'][:4], axis=1), 1.0)
+    np.testing.assert_allclose(vertex_normals(arrays['vertices'], arrays['faces'][:2])[:4], [[0, 0, 1]] * 4)
+
+def test_cache_round_trip(tmp_path):
+    path = write(tmp_path, MIXED_OBJ)
+    cache_dir = str(tmp_path / 'cache')
+    parsed, _ = parse_obj(path)
+    for _ in range(2):  # Cold, then from the memory-mapped entry
+        cached, _ = load_obj(path, cache_dir)
+        for name in parsed:
+            np.testing.assert_array_equal(cached[name], parsed[name])
@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+from mesh_slicing import FaceProjectionIndex, slice_faces, slice_mask
+
+def _brute_force(vertices, faces, origin, normal):
+    distances = (vertices[faces] - origin) @ normal
+    return np.flatnonzero(distances.min(axis=1) * distances.max(axis=1) <= 0)
+
+@pytest.fixture
+def mesh():
+    rng = np.random.default_rng(0)
+    vertices = rng.normal(size=(300, 3))
+    faces = rng.integers(0, len(vertices), size=(500, 3))
+    return vertices, faces
+
+def test_slice_faces_matches_brute_force(mesh):
+    vertices, faces = mesh
+    rng = np.random.default_rng(1)
+    origins = rng.normal(size=(20, 3)) * 0.5
+    normals = rng.normal(size=(20, 3))
+    # A tiny block limit forces one plane per block
+    for max_block_bytes in (1, 1 << 20):
+        for origin, normal, hit in zip(origins, normals, slice_faces(vertices, faces, origins, normals,
+                                                                     max_block_bytes)):
+            np.testing.assert_array_equal(hit, _brute_force(vertices, faces, origin, normal))
+
+def test_slice_mask_counts_faces_touching_the_plane():
+    vertices = np.array([[0.0, 0, 0], [1, 0, 0], [0, 1, 0], [0, 0, 1], [0, 0, 2], [1, 0, 2]])
+    faces = np.array([[0, 1, 2], [0, 1, 3], [3, 4, 5]])
+    # z = 0 holds face 0 and touches face 1 at an edge; face 2 lies above it
+    mask = slice_mask(vertices, faces, [0, 0, 0], [0, 0, 1])
+    np.testing.assert_array_equal(mask, [[True, True, False]])
+
+def test_face_projection_index_matches_brute_force(mesh):
+    vertices, faces = mesh
+    reference = np.array([0.0, 0.0, 1.0])
+    index = FaceProjectionIndex(vertices, faces, reference)
+    rng = np.random.default_rng(2)
+    normals = reference + rng.normal(scale=0.1, size=(20, 3))
+    normals /= np.linalg.norm(normals, axis=1, keepdims=True)
+    origins = rng.normal(size=(20, 3)) * 0.5
+    for origin, normal, hit in zip(origins, normals, index.query_batch(origins, normals)):
+        np.testing.assert_array_equal(hit, _brute_force(vertices, faces, origin, normal))
@@ -0,0 +1,30 @@
+import cv2
+import numpy as np
+
+from packed_dataset import PackedDataset, pack_dataset
+
+def _write_samples(image_dir, label_dir, count=3):
+    image_dir.mkdir()
+    label_dir.mkdir()
+    for i in range(count):
+        cv2.imwrite(str(image_dir / f"mug_{i}.png"), np.full((16, 24, 3), i * 40, dtype=np.uint8))
+        (label_dir / f"mug_{i}.txt").write_text(f"0 0.5 0.5 0.{i + 1} 0.2\n")
+
+def test_pack_round_trip(tmp_path):
+    _write_samples(tmp_path / 'images', tmp_path / 'labels')
+    pack_dataset(tmp_path / 'images', tmp_path / 'labels', tmp_path / 'packed', shard_bytes=1)
+    dataset = PackedDataset(tmp_path / 'packed')
+    assert len(dataset) == 3 and dataset.decoded is None
+    image, labels = dataset[2]
+    assert image.shape == (16, 24, 3) and (image == 80).all()
+    np.testing.assert_allclose(labels, [[0, 0.5, 0.5, 0.3, 0.2]])
+
+def test_repack_without_decoded_drops_images_npy(tmp_path):
+    _write_samples(tmp_path / 'images', tmp_path / 'labels')
+    pack_dataset(tmp_path / 'images', tmp_path / 'labels', tmp_path / 'packed', decoded=True)
+    assert PackedDataset(tmp_path / 'packed').decoded is not None
+    cv2.imwrite(str(tmp_path / 'images' / 'mug_0.png'), np.full((16, 24, 3), 200, dtype=np.uint8))
+    pack_dataset(tmp_path / 'images', tmp_path / 'labels', tmp_path / 'packed')
+    dataset = PackedDataset(tmp_path / 'packed')
+    assert dataset.decoded is None
+    assert (dataset.image(0) == 200).all()
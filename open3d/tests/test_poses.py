@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+from poses import SAMPLERS, make_pose_table, rotations_facing
+
+def _quaternion_matrices(q):
+    w, x, y, z = q.T
+    return np.stack([
+        np.stack([1 - 2 * (y * y + z * z), 2 * (x * y - w * z), 2 * (x * z + w * y)], axis=-1),
+        np.stack([2 * (x * y + w * z), 1 - 2 * (x * x + z * z), 2 * (y * z - w * x)], axis=-1),
+        np.stack([2 * (x * z - w * y), 2 * (y * z + w * x), 1 - 2 * (x * x + y * y)], axis=-1),
+    ], axis=1)
+
+@pytest.mark.parametrize('sampler', sorted(SAMPLERS))
+def test_pose_table_is_rotations_with_matching_quaternions(sampler):
+    table = make_pose_table(sampler, 50, seed=3)
+    rotations = table['rotation']
+    np.testing.assert_array_equal(table['index'], np.arange(50))
+    np.testing.assert_allclose(rotations @ rotations.transpose(0, 2, 1), np.broadcast_to(np.eye(3), (50, 3, 3)),
+                               atol=1e-9)
+    np.testing.assert_allclose(np.linalg.det(rotations), 1.0, atol=1e-9)
+    assert (table['quaternion'][:, 0] >= 0).all()
+    np.testing.assert_allclose(_quaternion_matrices(table['quaternion']), rotations, atol=1e-9)
+
+@pytest.mark.parametrize('sampler', sorted(SAMPLERS))
+def test_pose_table_is_seeded(sampler):
+    np.testing.assert_array_equal(make_pose_table(sampler, 20, seed=1), make_pose_table(sampler, 20, seed=1))
+    assert not np.allclose(make_pose_table(sampler, 20, seed=1)['rotation'],
+                           make_pose_table(sampler, 20, seed=2)['rotation'])
+
+def test_unknown_sampler():
+    with pytest.raises(ValueError):
+        make_pose_table('spiral', 10)
+
+def test_rotations_facing_turns_direction_to_camera():
+    directions = np.array([[1.0, 0, 0], [0, 1, 0], [0, -1, 0], [1, 2, 3]])
+    rotations = rotations_facing(directions)
+    unit = directions / np.linalg.norm(directions, axis=1, keepdims=True)
+    np.testing.assert_allclose(np.einsum('nij,nj->ni', rotations, unit), [[0, 0, 1]] * 4, atol=1e-12)
+
+def test_elevation_bands_stay_in_their_bands():
+    bands = ((-10, 10), (35, 60))
+    table = make_pose_table('bands', 40, bands=bands)
+    # The view direction is the third row of each rotation
+    elevation = np.degrees(np.arcsin(table['rotation'][:, 2, 1]))
+    for b, (low, high) in enumerate(bands):
+        assert ((elevation[b::2] >= low - 1e-9) & (elevation[b::2] <= high + 1e-9)).all()
@@ -0,0 +1,38 @@
+import telemetry
+from telemetry import Telemetry
+
+def _record(registry, stage_seconds):
+    registry.count('images_written', 2, backend='offscreen')
+    for seconds in stage_seconds:
+        registry.observe('stage_seconds', seconds, stage='render')
+
+def test_drain_empties_the_registry():
+    registry = Telemetry()
+    _record(registry, [0.003])
+    counters, histograms = registry.drain()
+    assert counters == {('images_written', (('backend', 'offscreen'),)): 2}
+    assert set(histograms) == {('stage_seconds', (('stage', 'render'),))}
+    assert registry.drain() == ({}, {})
+
+def test_merge_adds_drained_metrics():
+    parent, worker = Telemetry(), Telemetry()
+    _record(parent, [0.003, 0.2])
+    _record(worker, [0.003, 3.0])
+    parent.merge(worker.drain())
+    parent.merge(({('frames_skipped', ()): 1}, {}))
+    assert parent.counters[('images_written', (('backend', 'offscreen'),))] == 4
+    assert parent.counters[('frames_skipped', ())] == 1
+    h = parent.histograms[('stage_seconds', (('stage', 'render'),))]
+    assert (h.count, h.max, round(h.sum, 6)) == (4, 3.0, 3.206)
+    assert sum(h.counts) == 4 and h.quantile(0.5) == 0.005
+
+def test_collect_returns_result_and_task_metrics():
+    def task(x):
+        telemetry.count('tasks_run')
+        return x * 2
+
+    registry = Telemetry()
+    assert telemetry.merged(telemetry.collect(task)(21), registry) == 42
+    assert registry.counters[('tasks_run', ())] == 1
+    # The task's metrics were drained out of this process's registry
+    assert ('tasks_run', ()) not in telemetry.TELEMETRY.counters
@@ -0,0 +1,30 @@
+import os
+import numpy as np
+from yolo_labels import (class_name_from_filename, get_class_id, get_class_mapping, letterbox_label_line,
+                         mesh_class_name)
+
+def test_class_name_from_filename_drops_extension():
+    assert class_name_from_filename('train/images/pringles_01.png') == 'pringles'
+    assert class_name_from_filename('models_/pringles/pringles.obj') == 'pringles'
+
+def test_mesh_class_name_uses_class_directory(tmp_path):
+    for name in ('pringles', 'cola'):
+        os.makedirs(tmp_path / name / 'scan')
+    mapping = get_class_mapping(tmp_path)
+    nested = tmp_path / 'cola' / 'scan' / 'model_v2.obj'
+    assert mesh_class_name(tmp_path / 'pringles' / 'pringles.obj', tmp_path) == 'pringles'
+    assert mesh_class_name(nested, tmp_path) == 'cola'
+    assert get_class_id(mesh_class_name(nested, tmp_path), mapping) == mapping['cola']
+
+def test_mesh_class_name_falls_back_to_prefix_in_root(tmp_path):
+    assert mesh_class_name(tmp_path / 'cola_can.obj', tmp_path) == 'cola'
+
+def test_letterbox_label_line_box():
+    # 200x100 into 100x100: scale 0.5, 25 px bars above and below
+    line = letterbox_label_line('3 0.5 0.5 0.2 0.4\n', 200, 100, 100)
+    assert line.split()[0] == '3'
+    np.testing.assert_allclose([float(v) for v in line.split()[1:]], [0.5, 0.5, 0.2, 0.2])
+
+def test_letterbox_label_line_polygon():
+    line = letterbox_label_line('1 0 0 1 0 1 1\n', 200, 100, 100)
+    np.testing.assert_allclose([float(v) for v in line.split()[1:]], [0, 0.25, 1, 0.25, 1, 0.75])
@@ -0,0 +1,156 @@
+import numpy as np
+import os
+from image_io import letterbox_geometry
+
+def get_class_mapping(root_dir):
+    """Generate a mapping of class names to IDs based on subdirectories."""
+    class_names = [d for d in os.listdir(root_dir) if os.path.isdir(os.path.join(root_dir, d))]
+    class_mapping = {class_name: idx for idx, class_name in enumerate(class_names)}
+    return class_mapping
+
+def get_class_id(class_name, class_mapping):
+    """Get the class ID from the class name based on the class mapping."""
+    return class_mapping.get(class_name, -1)  # -1 indicates an unknown class
+
+def class_name_from_filename(file_name):
+    """Class name is the filename prefix (without extension) before the first underscore."""
+    return os.path.splitext(os.path.basename(file_name))[0].split('_')[0]
+
+def mesh_class_name(obj_file_path, root_dir):
+    """Class name of a mesh under root_dir: the subdirectory of root_dir it sits in, as get_class_mapping sees it.
+
+    Meshes directly in root_dir fall back to their filename prefix.
+    """
+    relative = os.path.relpath(os.path.abspath(obj_file_path), os.path.abspath(root_dir))
+    parts = relative.split(os.sep)
+    if len(parts) > 1:
+        return parts[0]
+    return class_name_from_filename(obj_file_path)
+
+def project_points(points, intrinsic, extrinsic):
+    """Project (N, 3) world points to (N, 2) pixel coordinates.
+
+    intrinsic is the 3x3 pinhole matrix and extrinsic the 4x4 world-to-camera
+    transform, as returned by Open3D's PinholeCameraParameters. Points behind
+    the camera are dropped.
+    """
+    points = np.asarray(points, dtype=np.float64)
+    camera_points = points @ extrinsic[:3, :3].T + extrinsic[:3, 3]
+    camera_points = camera_points[camera_points[:, 2] > 1e-9]
+    pixels = camera_points @ np.asarray(intrinsic).T
+    return pixels[:, :2] / pixels[:, 2:3]
+
+def bbox_from_points(pixels, image_width, image_height):
+    """Axis-aligned (x, y, w, h) box around projected points, clipped to the image."""
+    if len(pixels) == 0:
+        return None
+    x_min, y_min = np.maximum(pixels.min(axis=0), 0)
+    x_max = min(pixels[:, 0].max(), image_width)
+    y_max = min(pixels[:, 1].max(), image_height)
+    if x_max <= x_min or y_max <= y_min:
+        return None
+    return float(x_min), float(y_min), float(x_max - x_min), float(y_max - y_min)
+
+def mesh_bbox(vertices, intrinsic, extrinsic, image_width, image_height):
+    """Exact image-space box of a mesh, from its projected vertices."""
+    pixels = project_points(vertices, intrinsic, extrinsic)
+    return bbox_from_points(pixels, image_width, image_height)
+
+def mask_from_depth(depth):
+    """Pixels with geometry have a positive depth; the background reads 0."""
+    return np.asarray(depth) > 0
+
+def bbox_from_mask(mask):
+    """Tight (x, y, w, h) pixel box around the True pixels of a mask."""
+    rows = np.flatnonzero(mask.any(axis=1))
+    cols = np.flatnonzero(mask.any(axis=0))
+    if len(rows) == 0:
+        return None
+    x, y = cols[0], rows[0]
+    return int(x), int(y), int(cols[-1] + 1 - x), int(rows[-1] + 1 - y)
+
+def polygon_from_mask(mask, max_points=64):
+    """Outline polygon of a mask as an (N, 2) array of pixel (x, y) points.
+
+    Built from the leftmost and rightmost foreground pixel of every row, so it
+    is exact for shapes that are convex along rows (cans, bottles, boxes) and
+    fills in holes and side notches otherwise.
+    """
+    rows = np.flatnonzero(mask.any(axis=1))
+    if len(rows) == 0:
+        return None
+    band = mask[rows]
+    left = band.argmax(axis=1)
+    right = band.shape[1] - band[:, ::-1].argmax(axis=1)
+    # Down the left edge, then back up the right edge
+    polygon = np.concatenate([np.stack([left, rows], axis=1),
+                              np.stack([right, rows + 1], axis=1)[::-1]])
+    if len(polygon) > max_points:
+        polygon = polygon[np.linspace(0, len(polygon) - 1, max_points).round().astype(int)]
+    return polygon
+
+def yolo_polygon_line(class_id, polygon, image_width, image_height):
+    """Format an (N, 2) pixel polygon as a YOLO segmentation label line."""
+    normalized = np.asarray(polygon, dtype=np.float64) / [image_width, image_height]
+    return f"{class_id} " + " ".join(f"{v:.6f}" for v in normalized.ravel()) + "\n"
+
+def yolo_bbox_line(class_id, bbox, image_width, image_height):
+    """Format an (x, y, w, h) pixel box as a YOLO label line."""
+    x, y, w, h = bbox
+    center_x = (x + w / 2) / image_width
+    center_y = (y + h / 2) / image_height
+    width = w / image_width
+    height = h / image_height
+    return f"{class_id} {center_x} {center_y} {width} {height}\n"
+
+def yolo_line_to_bbox(line, image_width, image_height):
+    """Pixel (x, y, w, h) box of a YOLO detection label line."""
+    center_x, center_y, width, height = (float(v) for v in line.split()[1:5])
+    w = width * image_width
+    h = height * image_height
+    return center_x * image_width - w / 2, center_y * image_height - h / 2, w, h
+
+def letterbox_label_line(line, image_width, image_height, size):
+    """Move a YOLO box or polygon line of an image onto that image letterboxed to size x size."""
+    values = line.split()
+    coords = np.array(values[1:], dtype=np.float64)
+    scale, (left, top), _ = letterbox_geometry(image_width, image_height, size)
+    if len(coords) == 4:
+        center = coords[:2] * [image_width, image_height] * scale + [left, top]
+        extent = coords[2:] * [image_width, image_height] * scale
+        coords = np.concatenate([center, extent]) / size
+    else:
+        coords = (coords.reshape(-1, 2) * [image_width, image_height] * scale + [left, top]).ravel() / size
+    return f"{values[0]} " + " ".join(f"{v:.6f}" for v in coords) + "\n"
+
+def write_yolo_label(annotation_file, lines):
+    """Write YOLO label lines to annotation_file."""
+    with open(annotation_file, 'w') as f:
+        f.writelines(lines)
+
+def frame_labels(frame, vertices, class_id, label_source='projection', with_polygon=False):
+    """Detection and optional segmentation label lines for a rendered frame.
+
+    frame is a render_backends.Frame and vertices the mesh's unposed
+    vertices. label_source picks how the box is found: 'projection' projects
+    the vertices through the frame's camera, 'depth' boxes the foreground
+    mask of the frame's depth buffer (which polygons always need). Either
+    line is None when the object is not in view.
+    """
+    image_height, image_width = frame.image.shape[:2]
+    mask = None
+    if label_source == 'depth' or with_polygon:
+        mask = mask_from_depth(frame.depth)
+
+    if label_source == 'depth':
+        bbox = bbox_from_mask(mask)
+    else:
+        bbox = mesh_bbox(vertices, frame.intrinsic, frame.extrinsic, image_width, image_height)
+    box_line = yolo_bbox_line(class_id, bbox, image_width, image_height) if bbox else None
+
+    seg_line = None
+    if with_polygon:
+        polygon = polygon_from_mask(mask)
+        if polygon is not None:
+            seg_line = yolo_polygon_line(class_id, polygon, image_width, image_height)
+    return box_line, seg_line